@@ -5,22 +5,45 @@ Integrated with the existing interview logic.
 
 import os
 import sys
-from flask import Flask, request, jsonify
+import json
+
+# Async mode serves requests on gevent greenlets, so a request waiting on the
+# LLM yields the worker instead of blocking it. Patching must happen before
+# anything imports socket/ssl/threading.
+ASYNC_MODE = os.getenv("BACKEND_ASYNC", "0") == "1" or "--async" in sys.argv
+if ASYNC_MODE:
+    from gevent import monkey
+    monkey.patch_all()
+
+import threading
+import time
+from collections import deque, OrderedDict
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
+from flask_sock import Sock
 from dotenv import load_dotenv
 
-# Get the Dheenath-demo14 directory path
-demo_dir = os.path.join(os.path.dirname(__file__), 'Dheenath-demo14')
+# The interview logic lives in the interview/ directory. All of its file
+# access is relative to its own location, so the process cwd does not matter.
+demo_dir = os.path.join(os.path.dirname(__file__), 'interview')
 demo_dir = os.path.abspath(demo_dir)
 
-# Add the Dheenath-demo14 directory to the path
+# Add the interview directory to the path
 sys.path.insert(0, demo_dir)
 
 # Store the demo directory for later use
 DEMO_DIR = demo_dir
 
-from interview import InterviewManager
+from interview import InterviewManager, load_prompt
 from feedback import generate_feedback_v2
+from token_ledger import ledger
+from llm_cache import default_cache
+from model_router import get_default_router
+from role_catalog import catalog as role_catalog
+import code_runner
+from code_runner import run_solution, SandboxUnavailable
+from transcript_log import TranscriptLog, read_log, new_log, latest_log_path
+from profiler import SamplingProfiler, profiled, profile_name, should_profile
 
 # Load environment variables (try both locations)
 env_path = os.path.join(demo_dir, '.env')
@@ -31,6 +54,39 @@ load_dotenv(env_path)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+sock = Sock(app)  # WebSocket routes
+
+# Opt-in request profiling: send "X-Profile: <PROFILE_TOKEN>" or set PROFILE_SAMPLE_RATE.
+# The profile file is named after the session and turn and returned in the
+# X-Profile-File header. Socket turns are profiled one by one in socket_turn.
+@app.before_request
+def start_profiler():
+    if request.method == 'OPTIONS' or request.path == '/ws':
+        return
+    if should_profile(request.headers.get('X-Profile')):
+        g.profiler = SamplingProfiler().start()
+
+@app.after_request
+def write_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.stop()
+    data = request.get_json(silent=True) or {}
+    turn_id = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    try:
+        path = profiler.write(profile_name(data.get('session_id'), turn_id, label=request.path))
+        response.headers['X-Profile-File'] = os.path.basename(path)
+    except Exception as e:
+        print(f"Could not write profile: {e}")
+    return response
+
+@app.teardown_request
+def stop_profiler(error=None):
+    # Requests that raised never reach after_request
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
 
 def handle_rate_limit_error(error_str):
     """
@@ -66,45 +122,338 @@ def handle_rate_limit_error(error_str):
 # Store interview sessions (in production, use a database)
 # Format: { session_id: { manager: InterviewManager, state: str, role: str, topic: str, question_number: int, current_question: str } }
 interview_sessions = {}
+interview_sessions_lock = threading.Lock()
+# session_id -> lock held while that session is restored or created
+session_loading_locks = {}
+
+# Turns on the same session run one at a time. Each turn may carry an
+# idempotency key; duplicates of an in-flight turn wait for and share its
+# result, and retries of a completed turn get the stored response replayed.
+# Format: { session_id: Lock }, { session_id: OrderedDict(key -> { done: Event, result }) }
+session_locks = {}
+turn_records = {}
+turn_records_lock = threading.Lock()
+TURN_RECORDS_PER_SESSION = 50
+
+def get_session_lock(session_id):
+    with turn_records_lock:
+        if session_id not in session_locks:
+            session_locks[session_id] = threading.RLock()
+        return session_locks[session_id]
+
+def run_turn(session_id, idempotency_key, turn):
+    """
+    Runs `turn()` (which returns (response dict, status)) under the session lock,
+    at most once per idempotency key. Failed turns (5xx/429) are not stored, so
+    a retry runs them again.
+    """
+    if not idempotency_key:
+        with get_session_lock(session_id):
+            return turn()
+
+    with turn_records_lock:
+        records = turn_records.setdefault(session_id, OrderedDict())
+        record = records.get(idempotency_key)
+        is_owner = record is None
+        if is_owner:
+            record = {'done': threading.Event(), 'result': None}
+            records[idempotency_key] = record
+            while len(records) > TURN_RECORDS_PER_SESSION:
+                records.popitem(last=False)
+
+    if not is_owner:
+        # Duplicate submission: wait for the original and replay its response
+        record['done'].wait()
+        payload, status = record['result']
+        return dict(payload, replayed=True), status
+
+    try:
+        with get_session_lock(session_id):
+            record['result'] = turn()
+    except Exception as e:
+        record['result'] = ({'error': str(e), 'status': 'error'}, 500)
+    finally:
+        if record['result'] is None or record['result'][1] >= 429:
+            with turn_records_lock:
+                turn_records.get(session_id, {}).pop(idempotency_key, None)
+        record['done'].set()
+    return record['result']
+
+# Session fields written to the transcript log after each turn, so a restarted
+# backend resumes the interview where it stopped
+SESSION_STATE_FIELDS = ('state', 'role', 'topic', 'is_developer', 'question_number',
+                        'current_question', 'current_difficulty_index', 'coding_question')
 
-def get_or_create_session(session_id):
-    """Get existing session or create a new one"""
-    if session_id not in interview_sessions:
+def new_session(manager):
+    return {
+        'manager': manager,
+        'state': 'initializing',  # initializing, role_set, interviewing, completed
+        'role': None,
+        'topic': None,
+        'is_developer': False,
+        'question_number': 0,
+        'current_question': None,
+        'difficulty_levels': ["Easy", "Easy", "Medium", "Medium", "Medium", "Medium", "Hard", "Hard", "Hard", "Hard"],
+        'current_difficulty_index': 0,
+        'coding_question': None,  # last main question, which follow-ups refer back to
+        'code_runs': {}  # question -> latest code_runner result
+    }
+
+def new_manager(session_id):
+    """InterviewManager with a new transcript log; earlier interviews keep their own logs"""
+    log, interview = new_log(session_id)
+    if log:
+        log.append({'type': 'session', 'session_id': session_id, 'interview': interview, 'created_at': time.time()})
+    try:
+        return InterviewManager(session_id=session_id, log=log)
+    except Exception:
+        if log:
+            log.close()
+        raise
+
+def restore_session(session_id):
+    """Rebuilds a session from its latest transcript log (e.g. after a restart), or returns None"""
+    path = latest_log_path(session_id)
+    if not path:
+        return None
+    header, turns, state = read_log(path)
+    if header.get('session_id') != session_id:
+        return None
+    
+    manager = InterviewManager(session_id=session_id, log=TranscriptLog(path))
+    manager.restore_turns(turns)
+    manager.role = state.get('role')
+    manager.topic = state.get('topic')
+    session = new_session(manager)
+    session.update({field: state[field] for field in SESSION_STATE_FIELDS if field in state})
+    session['code_runs'] = state.get('code_runs', {})
+    print(f"Restored session {session_id} from its transcript log ({len(turns)} turns)")
+    return session
+
+def save_session_state(session):
+    session['manager'].log_state(**{field: session[field] for field in SESSION_STATE_FIELDS})
+
+def get_or_create_session(session_id, create=True):
+    """
+    Get existing session, restore it from its transcript log, or create a new one.
+    With create=False, returns (None, None) for a session that has no log.
+    """
+    with interview_sessions_lock:
+        if session_id in interview_sessions:
+            return interview_sessions[session_id], None
+        loading = session_loading_locks.setdefault(session_id, threading.Lock())
+
+    # Reading the log happens outside the global lock, so only requests for
+    # this session wait on the disk
+    with loading:
+        with interview_sessions_lock:
+            if session_id in interview_sessions:
+                return interview_sessions[session_id], None
+        session, error = None, None
         try:
-            # Note: Working directory should be set to DEMO_DIR before calling this
-            manager = InterviewManager()
-            
-            interview_sessions[session_id] = {
-                'manager': manager,
-                'state': 'initializing',  # initializing, role_set, interviewing, completed
-                'role': None,
-                'topic': None,
-                'question_number': 0,
-                'current_question': None,
-                'difficulty_levels': ["Easy", "Easy", "Medium", "Medium", "Medium", "Medium", "Hard", "Hard", "Hard", "Hard"],
-                'current_difficulty_index': 0
-            }
+            session = restore_session(session_id)
+            if session is None and create:
+                session = new_session(new_manager(session_id))
         except Exception as e:
-            return None, f"Failed to initialize interview manager: {str(e)}"
-    return interview_sessions[session_id], None
+            error = f"Failed to initialize interview manager: {str(e)}"
+        with interview_sessions_lock:
+            if session is not None:
+                interview_sessions[session_id] = session
+            session_loading_locks.pop(session_id, None)
+        return session, error
+
+def resolve_role(manager, text):
+    """
+    Resolves a selected or spoken role to a catalog entry. Known roles resolve
+    locally; unknown ones go through LLM correction once and are then cached.
+    """
+    return role_catalog.resolve_or_correct(
+        text,
+        lambda raw: manager.correct_transcription(raw, "Job Role Selection", call_type="role_correction", fallback=False)
+    )
+
+def apply_role(session, match):
+    """Sets the session's role, topic and interview type from a catalog match"""
+    manager = session['manager']
+    session['role'] = match.name
+    session['is_developer'] = match.is_developer
+    session['topic'] = match.topic
+    session['state'] = 'role_set'
+    manager.set_role(match.name)
+    manager.set_topic(match.topic)
+
+def process_message(session_id, user_message, role_from_request=None, on_token=None):
+    """
+    Runs one interview turn for a session. Shared by the REST and WebSocket endpoints.
+    `on_token(text, attempt)` receives partial question text as it is generated.
+    Returns: (response dict, HTTP status code)
+    """
+    # Get or create session
+    session, error = get_or_create_session(session_id)
+    if error:
+        return {
+            'error': error,
+            'status': 'error'
+        }, 500
+    
+    manager = session['manager']
+    state = session['state']
+    
+    # Check if role is provided in request (from role selection)
+    if role_from_request:
+        apply_role(session, resolve_role(manager, role_from_request))
+    
+    # Handle different states of the interview
+    response_text = ""
+    
+    if state == 'initializing':
+        # First message should be the job role
+        if not session['role']:
+            # Resolve against the role catalog; the LLM only sees unknown roles
+            match = resolve_role(manager, user_message)
+            apply_role(session, match)
+    
+            response_text = f"Great! I'll focus on the core concepts and topics relevant to {match.name}. Let's begin the interview.\n\nI'll ask you questions of varying difficulty levels. Please answer them to the best of your ability."
+        else:
+            response_text = "Please provide your job role to start the interview."
+    
+    elif state == 'role_set' or state == 'interviewing':
+        # Check if this is an answer to a question
+        if session['current_question']:
+            # This is an answer
+            corrected_answer = manager.correct_transcription(user_message, f"Answer to interview question: {session['current_question']}")
+    
+            # Record the interaction
+            manager.record_interaction(session['current_question'], corrected_answer)
+    
+            # Generate follow-up question
+            try:
+                difficulty = session['difficulty_levels'][session['current_difficulty_index']]
+                is_developer = session.get('is_developer', False)
+                followup_question = manager.generate_question(
+                    difficulty,
+                    is_followup=True,
+                    previous_question=session['current_question'],
+                    previous_answer=corrected_answer,
+                    is_developer=is_developer,
+                    on_token=on_token
+                )
+    
+                if followup_question and followup_question.strip():
+                    session['current_question'] = followup_question
+                    response_text = followup_question
+                else:
+                    # Move to next main question
+                    session['current_question'] = None
+                    response_text = "Thank you for your answer. Let me ask you another question."
+            except Exception as e:
+                error_str = str(e)
+                rate_limit_msg, wait_time = handle_rate_limit_error(error_str)
+    
+                if wait_time is not None:
+                    # It's a rate limit error
+                    response_text = f"Thank you for your answer!\n\n{rate_limit_msg}\n\nFor now, let's continue with the next question."
+                else:
+                    # Regular error
+                    response_text = f"Thank you for your answer. Let me ask you another question.\n\n(Error generating follow-up: {error_str})"
+                session['current_question'] = None
+        else:
+            # Generate a new question
+            session['state'] = 'interviewing'
+            session['current_difficulty_index'] = min(session['current_difficulty_index'], len(session['difficulty_levels']) - 1)
+            difficulty = session['difficulty_levels'][session['current_difficulty_index']]
+            is_developer = session.get('is_developer', False)
+    
+            try:
+                question = manager.generate_question(difficulty, is_developer=is_developer, on_token=on_token)
+                session['current_question'] = question
+                session['coding_question'] = question  # follow-ups keep running code against this
+                session['question_number'] += 1
+                response_text = question
+            except Exception as e:
+                error_str = str(e)
+                rate_limit_msg, wait_time = handle_rate_limit_error(error_str)
+    
+                if wait_time is not None:
+                    # It's a rate limit error
+                    response_text = rate_limit_msg
+                    return {
+                        'response': response_text,
+                        'status': 'error',
+                        'session_id': session_id,
+                        'rate_limit_error': True,
+                        'wait_time_seconds': wait_time
+                    }, 429  # HTTP 429 Too Many Requests
+                else:
+                    # Regular error
+                    response_text = f"Error generating question: {error_str}"
+                    return {
+                        'response': response_text,
+                        'status': 'error',
+                        'session_id': session_id
+                    }, 500
+    
+        # Check if we should move to next difficulty level
+        if session['current_question'] is None:
+            session['current_difficulty_index'] += 1
+    
+            # Check if interview is complete
+            if session['current_difficulty_index'] >= len(session['difficulty_levels']):
+                # Generate feedback
+                try:
+                    transcript = manager.get_transcript_text()
+                    feedback = generate_feedback_v2(
+                        transcript, session['role'], session['topic'], session_id=session_id,
+                        code_results=list(session['code_runs'].items())
+                    )
+                    session['state'] = 'completed'
+                    response_text = f"Interview completed! Here's your feedback:\n\n{feedback}"
+                except Exception as e:
+                    error_str = str(e)
+                    rate_limit_msg, wait_time = handle_rate_limit_error(error_str)
+    
+                    if wait_time is not None:
+                        # It's a rate limit error
+                        response_text = f"Interview completed! However, I cannot generate feedback right now due to a rate limit.\n\n{rate_limit_msg}\n\nYou can request feedback later using the feedback endpoint."
+                    else:
+                        # Regular error
+                        response_text = f"Interview completed! However, there was an error generating feedback: {error_str}"
+                    session['state'] = 'completed'
+    
+    elif state == 'completed':
+        response_text = "The interview has been completed. Would you like to start a new interview? If so, please provide a new job role."
+        # Reset session
+        session['state'] = 'initializing'
+        session['role'] = None
+        session['topic'] = None
+        session['question_number'] = 0
+        session['current_question'] = None
+        session['current_difficulty_index'] = 0
+        session['code_runs'] = {}
+        session['coding_question'] = None
+        manager.close()
+        manager = new_manager(session_id)
+        session['manager'] = manager
+    
+    save_session_state(session)
+    return {
+        'response': response_text,
+        'status': 'success',
+        'session_id': session_id,
+        'state': session['state']
+    }, 200
 
 @app.route('/api', methods=['POST', 'OPTIONS'])
 def handle_message():
     """
     Handle incoming messages from the frontend.
-    Expected request: { "message": "user message", "session_id": "optional" }
+    Expected request: { "message": "user message", "session_id": "optional", "idempotency_key": "optional" }
+    (the idempotency key may also be sent as an Idempotency-Key header)
     Returns: { "response": "backend response", "session_id": "session_id" }
     """
     if request.method == 'OPTIONS':
         return '', 200
     
-    # Set working directory to DEMO_DIR for file operations
-    original_cwd = os.getcwd()
-    try:
-        os.chdir(DEMO_DIR)
-    except:
-        pass  # If directory change fails, continue anyway
-    
     try:
         data = request.get_json()
         if not data:
@@ -116,6 +465,7 @@ def handle_message():
         user_message = data.get('message', '').strip()
         session_id = data.get('session_id', 'default')
         role_from_request = data.get('role', None)  # Role can come from frontend
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
         
         if not user_message:
             return jsonify({
@@ -123,189 +473,72 @@ def handle_message():
                 'status': 'error'
             }), 400
         
-        # Get or create session
-        session, error = get_or_create_session(session_id)
-        if error:
-            return jsonify({
-                'error': error,
-                'status': 'error'
-            }), 500
-        
-        manager = session['manager']
-        state = session['state']
-        
-        # Check if role is provided in request (from role selection)
-        is_developer = False
-        if role_from_request:
-            session['role'] = role_from_request
-            manager.set_role(role_from_request)
-            is_developer = role_from_request.lower() in ['engineer', 'developer', 'software engineer']
-            session['is_developer'] = is_developer
-            session['state'] = 'role_set'
-            
-            # Set topic based on role
-            if is_developer:
-                topic = "coding problems, algorithms, data structures, and system design"
-            else:
-                topic = f"core concepts and topics for {role_from_request}"
-            session['topic'] = topic
-            manager.set_topic(topic)
-        
-        # Handle different states of the interview
-        response_text = ""
-        
-        if state == 'initializing':
-            # First message should be the job role
-            if not session['role']:
-                # Correct transcription if needed
-                corrected_role = manager.correct_transcription(user_message, "Job Role Selection")
-                session['role'] = corrected_role
-                manager.set_role(corrected_role)
-                is_developer = corrected_role.lower() in ['engineer', 'developer', 'software engineer']
-                session['is_developer'] = is_developer
-                session['state'] = 'role_set'
-                
-                # Set topic based on role
-                if is_developer:
-                    topic = "coding problems, algorithms, data structures, and system design"
-                else:
-                    topic = f"core concepts and topics for {corrected_role}"
-                session['topic'] = topic
-                manager.set_topic(topic)
-                
-                response_text = f"Great! I'll focus on the core concepts and topics relevant to {corrected_role}. Let's begin the interview.\n\nI'll ask you questions of varying difficulty levels. Please answer them to the best of your ability."
-            else:
-                response_text = "Please provide your job role to start the interview."
-        
-        elif state == 'role_set' or state == 'interviewing':
-            # Check if this is an answer to a question
-            if session['current_question']:
-                # This is an answer
-                corrected_answer = manager.correct_transcription(user_message, f"Answer to interview question: {session['current_question']}")
-                
-                # Record the interaction
-                manager.record_interaction(session['current_question'], corrected_answer)
-                
-                # Generate follow-up question
-                try:
-                    difficulty = session['difficulty_levels'][session['current_difficulty_index']]
-                    is_developer = session.get('is_developer', False)
-                    followup_question = manager.generate_question(
-                        difficulty,
-                        is_followup=True,
-                        previous_question=session['current_question'],
-                        previous_answer=corrected_answer,
-                        is_developer=is_developer
-                    )
-                    
-                    if followup_question and followup_question.strip():
-                        session['current_question'] = followup_question
-                        response_text = followup_question
-                    else:
-                        # Move to next main question
-                        session['current_question'] = None
-                        response_text = "Thank you for your answer. Let me ask you another question."
-                except Exception as e:
-                    error_str = str(e)
-                    rate_limit_msg, wait_time = handle_rate_limit_error(error_str)
-                    
-                    if wait_time is not None:
-                        # It's a rate limit error
-                        response_text = f"Thank you for your answer!\n\n{rate_limit_msg}\n\nFor now, let's continue with the next question."
-                    else:
-                        # Regular error
-                        response_text = f"Thank you for your answer. Let me ask you another question.\n\n(Error generating follow-up: {error_str})"
-                    session['current_question'] = None
-            else:
-                # Generate a new question
-                session['state'] = 'interviewing'
-                session['current_difficulty_index'] = min(session['current_difficulty_index'], len(session['difficulty_levels']) - 1)
-                difficulty = session['difficulty_levels'][session['current_difficulty_index']]
-                is_developer = session.get('is_developer', False)
-                
-                try:
-                    question = manager.generate_question(difficulty, is_developer=is_developer)
-                    session['current_question'] = question
-                    session['question_number'] += 1
-                    response_text = question
-                except Exception as e:
-                    error_str = str(e)
-                    rate_limit_msg, wait_time = handle_rate_limit_error(error_str)
-                    
-                    if wait_time is not None:
-                        # It's a rate limit error
-                        response_text = rate_limit_msg
-                        return jsonify({
-                            'response': response_text,
-                            'status': 'error',
-                            'session_id': session_id,
-                            'rate_limit_error': True,
-                            'wait_time_seconds': wait_time
-                        }), 429  # HTTP 429 Too Many Requests
-                    else:
-                        # Regular error
-                        response_text = f"Error generating question: {error_str}"
-                        return jsonify({
-                            'response': response_text,
-                            'status': 'error',
-                            'session_id': session_id
-                        }), 500
-            
-            # Check if we should move to next difficulty level
-            if session['current_question'] is None:
-                session['current_difficulty_index'] += 1
-                
-                # Check if interview is complete
-                if session['current_difficulty_index'] >= len(session['difficulty_levels']):
-                    # Generate feedback
-                    try:
-                        transcript = manager.get_transcript_text()
-                        # Note: Working directory is already set to DEMO_DIR
-                        feedback = generate_feedback_v2(transcript, session['role'], session['topic'])
-                        session['state'] = 'completed'
-                        response_text = f"Interview completed! Here's your feedback:\n\n{feedback}"
-                    except Exception as e:
-                        error_str = str(e)
-                        rate_limit_msg, wait_time = handle_rate_limit_error(error_str)
-                        
-                        if wait_time is not None:
-                            # It's a rate limit error
-                            response_text = f"Interview completed! However, I cannot generate feedback right now due to a rate limit.\n\n{rate_limit_msg}\n\nYou can request feedback later using the feedback endpoint."
-                        else:
-                            # Regular error
-                            response_text = f"Interview completed! However, there was an error generating feedback: {error_str}"
-                        session['state'] = 'completed'
-        
-        elif state == 'completed':
-            response_text = "The interview has been completed. Would you like to start a new interview? If so, please provide a new job role."
-            # Reset session
-            session['state'] = 'initializing'
-            session['role'] = None
-            session['topic'] = None
-            session['question_number'] = 0
-            session['current_question'] = None
-            session['current_difficulty_index'] = 0
-            manager = InterviewManager()
-            session['manager'] = manager
-        
-        return jsonify({
-            'response': response_text,
-            'status': 'success',
-            'session_id': session_id,
-            'state': session['state']
-        }), 200
+        payload, status = run_turn(
+            session_id, idempotency_key,
+            lambda: process_message(session_id, user_message, role_from_request)
+        )
+        return jsonify(payload), status
         
     except Exception as e:
         return jsonify({
             'error': str(e),
             'status': 'error'
         }), 500
-    finally:
-        # Restore original working directory
+
+def start_session(session_id, role=None, token_cap=None):
+    """
+    Creates or resets a session and returns the welcome message.
+    Returns: (response dict, HTTP status code)
+    """
+    if token_cap is not None:
+        ledger.set_session_cap(session_id, int(token_cap))
+    
+    # Create or reset session
+    session, error = get_or_create_session(session_id)
+    if error:
+        return {
+            'error': error,
+            'status': 'error'
+        }, 500
+    
+    # Reset session
+    match = role_catalog.resolve(role) if role else None
+    session['state'] = 'initializing'
+    session['role'] = match.name if match else role
+    session['topic'] = None
+    session['question_number'] = 0
+    session['current_question'] = None
+    session['current_difficulty_index'] = 0
+    session['is_developer'] = False
+    session['code_runs'] = {}
+    session['coding_question'] = None
+    # A session with no answers yet (e.g. just created) keeps its log instead of
+    # leaving an empty interview file behind
+    if session['manager'].turns or session['manager'].question_index:
+        session['manager'].close()
         try:
-            os.chdir(original_cwd)
-        except:
-            pass
+            session['manager'] = new_manager(session_id)
+        except Exception as e:
+            return {
+                'error': f"Failed to initialize interview: {str(e)}",
+                'status': 'error'
+            }, 500
+    save_session_state(session)
+    
+    if role:
+        # Role already selected, welcome with role-specific message
+        if match and match.is_developer:
+            welcome_msg = "Hi! I'm Zyra, your AI interview coach. Welcome to your coding interview! I'll ask you coding problems with varying difficulty levels. You'll see the problem statement with input/output examples on the left, and you can write your solution in the code editor on the right. Let's begin!"
+        else:
+            welcome_msg = f"Hi! I'm Zyra, your AI interview coach. Welcome to your {session['role']} interview! I'll ask you questions relevant to this role. Let's begin!"
+    else:
+        welcome_msg = "Hi! I'm Zyra, your AI interview coach. Welcome to your mock interview session. Please select a job role to begin."
+    
+    return {
+        'response': welcome_msg,
+        'status': 'success',
+        'session_id': session_id
+    }, 200
 
 @app.route('/api/start', methods=['POST', 'OPTIONS'])
 def start_interview():
@@ -313,55 +546,62 @@ def start_interview():
     if request.method == 'OPTIONS':
         return '', 200
     
-    # Set working directory to DEMO_DIR for file operations
-    original_cwd = os.getcwd()
     try:
-        os.chdir(DEMO_DIR)
-    except:
-        pass
+        data = request.get_json()
+        session_id = data.get('session_id', 'default')
+        role = data.get('role', None)  # Optional role from frontend
+        token_cap = data.get('token_cap', None)  # Optional per-session token cap
+        
+        with get_session_lock(session_id):
+            payload, status = start_session(session_id, role, token_cap)
+        return jsonify(payload), status
+        
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/api/feedback', methods=['POST', 'OPTIONS'])
+def get_feedback():
+    """Get feedback for completed interview"""
+    if request.method == 'OPTIONS':
+        return '', 200
     
     try:
         data = request.get_json()
         session_id = data.get('session_id', 'default')
-        role = data.get('role', None)  # Optional role from frontend
         
-        # Create or reset session
-        session, error = get_or_create_session(session_id)
+        session, error = get_or_create_session(session_id, create=False)
         if error:
             return jsonify({
                 'error': error,
                 'status': 'error'
             }), 500
+        if session is None:
+            return jsonify({
+                'error': 'Session not found',
+                'status': 'error'
+            }), 404
         
-        # Reset session
-        session['state'] = 'initializing'
-        session['role'] = role if role else None
-        session['topic'] = None
-        session['question_number'] = 0
-        session['current_question'] = None
-        session['current_difficulty_index'] = 0
-        session['is_developer'] = False
-        try:
-            # Note: Working directory should be set to DEMO_DIR before calling this
-            session['manager'] = InterviewManager()
-        except Exception as e:
+        manager = session['manager']
+        
+        if session['state'] != 'completed' and len(manager.transcript) == 0:
             return jsonify({
-                'error': f"Failed to initialize interview: {str(e)}",
+                'error': 'No interview data available for feedback',
                 'status': 'error'
-            }), 500
+            }), 400
         
-        if role:
-            # Role already selected, welcome with role-specific message
-            is_developer = role.lower() in ['engineer', 'developer', 'software engineer']
-            if is_developer:
-                welcome_msg = "Hi! I'm Zyra, your AI interview coach. Welcome to your coding interview! I'll ask you coding problems with varying difficulty levels. You'll see the problem statement with input/output examples on the left, and you can write your solution in the code editor on the right. Let's begin!"
-            else:
-                welcome_msg = f"Hi! I'm Zyra, your AI interview coach. Welcome to your {role} interview! I'll ask you questions relevant to this role. Let's begin!"
-        else:
-            welcome_msg = "Hi! I'm Zyra, your AI interview coach. Welcome to your mock interview session. Please select a job role to begin."
+        with get_session_lock(session_id):
+            transcript = manager.get_transcript_text()
+            code_results = list(session['code_runs'].items())
+        feedback = generate_feedback_v2(
+            transcript, session['role'], session['topic'], session_id=session_id,
+            code_results=code_results
+        )
         
         return jsonify({
-            'response': welcome_msg,
+            'response': feedback,
             'status': 'success',
             'session_id': session_id
         }), 200
@@ -371,51 +611,74 @@ def start_interview():
             'error': str(e),
             'status': 'error'
         }), 500
-    finally:
-        # Restore original working directory
-        try:
-            os.chdir(original_cwd)
-        except:
-            pass
 
-@app.route('/api/feedback', methods=['POST', 'OPTIONS'])
-def get_feedback():
-    """Get feedback for completed interview"""
+@app.route('/api/code/run', methods=['POST', 'OPTIONS'])
+def run_code():
+    """
+    Run the candidate's solution for the current coding question in the sandbox.
+    Checks it against the question's Input/Output examples and measures how its
+    runtime and memory grow with input size. The latest run per question is
+    included in the interview feedback.
+    Off unless CODE_RUNNER_ENABLED is set, since it runs whatever code it is sent.
+    """
     if request.method == 'OPTIONS':
         return '', 200
-    
-    # Set working directory to DEMO_DIR for file operations
-    original_cwd = os.getcwd()
-    try:
-        os.chdir(DEMO_DIR)
-    except:
-        pass
+    if not code_runner.ENABLED:
+        return jsonify({
+            'error': 'Running code is disabled on this server (set CODE_RUNNER_ENABLED=1 to enable it)',
+            'status': 'error'
+        }), 403
+    if not code_runner.origin_allowed(request.headers.get('Origin')):
+        return jsonify({
+            'error': 'This origin may not run code (see CODE_RUNNER_ORIGINS)',
+            'status': 'error'
+        }), 403
     
     try:
         data = request.get_json()
         session_id = data.get('session_id', 'default')
+        code = data.get('code', '')
         
-        if session_id not in interview_sessions:
+        if not code.strip():
+            return jsonify({
+                'error': 'No code provided',
+                'status': 'error'
+            }), 400
+        session, error = get_or_create_session(session_id, create=False)
+        if error:
+            return jsonify({
+                'error': error,
+                'status': 'error'
+            }), 500
+        if session is None:
             return jsonify({
                 'error': 'Session not found',
                 'status': 'error'
             }), 404
         
-        session = interview_sessions[session_id]
-        manager = session['manager']
-        
-        if session['state'] != 'completed' and len(manager.transcript) == 0:
+        with get_session_lock(session_id):
+            question = session.get('coding_question')
+        if not question:
             return jsonify({
-                'error': 'No interview data available for feedback',
+                'error': 'There is no coding question to run against yet',
                 'status': 'error'
             }), 400
         
-        transcript = manager.get_transcript_text()
-        # Note: Working directory should be set to DEMO_DIR before calling this
-        feedback = generate_feedback_v2(transcript, session['role'], session['topic'])
+        # The run takes seconds, so the session lock is not held during it
+        try:
+            result = run_solution(code, question, entry_point=data.get('entry_point'))
+        except SandboxUnavailable as e:
+            return jsonify({
+                'error': str(e),
+                'status': 'error'
+            }), 503
+        with get_session_lock(session_id):
+            session['code_runs'][question] = result
+            # Logged so feedback after a restart still sees the runs
+            session['manager'].log_state(code_runs=session['code_runs'])
         
         return jsonify({
-            'response': feedback,
+            'result': result,
             'status': 'success',
             'session_id': session_id
         }), 200
@@ -426,6 +689,179 @@ def get_feedback():
             'status': 'error'
         }), 500
 
+# WebSocket channels, one per session. Server messages are numbered and kept in
+# a bounded outbox so a client that reconnects can resume from its last seq.
+# Format: { session_id: { seq: int, outbox: deque, ws: connection or None, lock: Lock } }
+ws_channels = {}
+ws_channels_lock = threading.Lock()
+WS_OUTBOX_SIZE = 200
+
+def get_channel(session_id):
+    with ws_channels_lock:
+        if session_id not in ws_channels:
+            ws_channels[session_id] = {
+                'seq': 0,
+                'outbox': deque(maxlen=WS_OUTBOX_SIZE),
+                'ws': None,
+                'lock': threading.Lock()
+            }
+        return ws_channels[session_id]
+
+def push(session_id, message, keep=True):
+    """
+    Sends a typed message to the session's socket, if one is connected.
+    Messages with keep=True get a seq number and are replayed on resume;
+    partial tokens are sent with keep=False since the final question replaces them.
+    """
+    channel = get_channel(session_id)
+    with channel['lock']:
+        message = dict(message, session_id=session_id)
+        if keep:
+            channel['seq'] += 1
+            message['seq'] = channel['seq']
+            channel['outbox'].append(message)
+        ws = channel['ws']
+        if ws is not None:
+            try:
+                ws.send(json.dumps(message))
+            except Exception:
+                # Connection dropped; the client resumes from its last seq
+                channel['ws'] = None
+
+def attach_socket(session_id, ws, last_seq):
+    """Binds a connection to a session and replays anything it missed."""
+    channel = get_channel(session_id)
+    with channel['lock']:
+        channel['ws'] = ws
+        for message in channel['outbox']:
+            if message['seq'] > last_seq:
+                ws.send(json.dumps(message))
+        session = interview_sessions.get(session_id)
+        ws.send(json.dumps({
+            'type': 'welcome',
+            'session_id': session_id,
+            'state': session['state'] if session else None,
+            'last_seq': channel['seq']
+        }))
+
+def detach_socket(session_id, ws):
+    if session_id is None:
+        return
+    channel = get_channel(session_id)
+    with channel['lock']:
+        if channel['ws'] is ws:
+            channel['ws'] = None
+
+def socket_turn(session_id, message):
+    """Runs an answer received over the socket and pushes the results."""
+    turn_id = message.get('turn_id')
+    text = (message.get('text') or '').strip()
+    if not text:
+        push(session_id, {'type': 'error', 'turn_id': turn_id, 'error': 'No message provided'})
+        return
+
+    session = interview_sessions.get(session_id)
+    previous_state = session['state'] if session else None
+
+    def on_token(token, attempt):
+        push(session_id, {'type': 'token', 'turn_id': turn_id, 'attempt': attempt, 'text': token}, keep=False)
+
+    with profiled(should_profile(message.get('profile')), profile_name(session_id, turn_id, 'ws')):
+        payload, status = run_turn(
+            session_id, turn_id,
+            lambda: process_message(session_id, text, message.get('role'), on_token=on_token)
+        )
+
+    if status == 429:
+        push(session_id, {
+            'type': 'event',
+            'event': 'rate_limit',
+            'turn_id': turn_id,
+            'message': payload['response'],
+            'wait_time_seconds': payload.get('wait_time_seconds')
+        })
+        return
+    if status != 200:
+        push(session_id, {'type': 'error', 'turn_id': turn_id, 'error': payload.get('error') or payload.get('response')})
+        return
+
+    push(session_id, {'type': 'question', 'turn_id': turn_id, 'text': payload['response'], 'state': payload['state']})
+    if payload['state'] != previous_state:
+        push(session_id, {'type': 'state', 'state': payload['state'], 'previous_state': previous_state})
+        if payload['state'] == 'completed':
+            push(session_id, {'type': 'event', 'event': 'feedback_ready'})
+
+@sock.route('/ws')
+def interview_socket(ws):
+    """
+    Duplex channel carrying a whole interview session.
+    Client -> server:
+        { type: "hello", session_id, last_seq }   (first message; resumes after reconnect)
+        { type: "start", role, token_cap }
+        { type: "answer", text, turn_id, role }
+        { type: "ping" }
+    Server -> client:
+        welcome, message, question, token (partial question text), state,
+        event (rate_limit, feedback_ready), error, pong
+    """
+    session_id = None
+    try:
+        while True:
+            raw = ws.receive()
+            if raw is None:
+                break
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                ws.send(json.dumps({'type': 'error', 'error': 'Invalid JSON'}))
+                continue
+
+            msg_type = message.get('type')
+            if msg_type == 'ping':
+                ws.send(json.dumps({'type': 'pong'}))
+            elif msg_type == 'hello':
+                session_id = message.get('session_id') or 'default'
+                attach_socket(session_id, ws, int(message.get('last_seq') or 0))
+            elif session_id is None:
+                ws.send(json.dumps({'type': 'error', 'error': 'Send a hello message with your session_id first'}))
+            elif msg_type == 'start':
+                with get_session_lock(session_id):
+                    payload, status = start_session(session_id, message.get('role'), message.get('token_cap'))
+                if status != 200:
+                    push(session_id, {'type': 'error', 'error': payload.get('error')})
+                else:
+                    push(session_id, {'type': 'message', 'text': payload['response']})
+                    push(session_id, {'type': 'state', 'state': interview_sessions[session_id]['state']})
+            elif msg_type == 'answer':
+                socket_turn(session_id, message)
+            else:
+                ws.send(json.dumps({'type': 'error', 'error': f"Unknown message type: {msg_type}"}))
+    finally:
+        detach_socket(session_id, ws)
+
+@app.route('/api/usage', methods=['GET'])
+def get_usage():
+    """
+    Token usage and quota forecast, plus LLM cache and model routing metrics.
+    Optional query param: session_id (adds that session's per-call-type usage)
+    """
+    usage = ledger.summary()
+    usage['llm_cache'] = default_cache.stats()
+    usage['routing'] = get_default_router().metrics()
+    session_id = request.args.get('session_id')
+    if session_id:
+        usage['session'] = {
+            'session_id': session_id,
+            'by_call_type': ledger.session_usage(session_id),
+            'total': ledger.session_total(session_id),
+            'over_cap': ledger.is_over_cap(session_id)
+        }
+    
+    return jsonify({
+        'usage': usage,
+        'status': 'success'
+    }), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -438,15 +874,47 @@ def health_check():
         'api_key_configured': api_key_set
     }), 200
 
+def warm_up():
+    """
+    Imports the LLM stack and reads the prompt templates ahead of the first
+    interview, which importing this module deliberately does not do. Under
+    gunicorn it runs in the master before workers fork (see gunicorn.conf.py),
+    so they share the imported modules copy-on-write. No LLM clients are
+    created here: their connection pools must not be shared across forks.
+    """
+    started = time.perf_counter()
+    import langchain_core.messages
+    if default_cache.mode != "replay":
+        import langchain_groq
+        # The Groq client reports the OS in its request headers, which runs
+        # `uname -p` the first time. Under gevent that subprocess yields, so
+        # every request arriving before it returns would fork its own; run it
+        # once here so platform caches the answer.
+        import platform
+        platform.platform()
+    for name in ("interviewer_prompt.txt", "developer_interviewer_prompt.txt", "feedback_prompt.txt"):
+        load_prompt(name)
+    print(f"Warm-up done in {time.perf_counter() - started:.2f}s")
+
 if __name__ == '__main__':
     # Check for API key
     if not os.getenv("GROQ_API_KEY"):
         print("⚠️  WARNING: GROQ_API_KEY not found in environment variables.")
-        print("Please set it in Dheenath-demo14/.env file")
+        print("Please set it in interview/.env or .env file")
         print("Continuing anyway, but interview features will not work...")
     
     print("Starting backend API server on http://localhost:5000")
     print("API endpoint: http://localhost:5000/api")
     print("Start interview: POST /api/start")
     print("Get feedback: POST /api/feedback")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    print("Token usage: GET /api/usage")
+    print("Interview WebSocket: ws://localhost:5000/ws")
+    
+    # Serve /health right away and load the LLM stack behind it
+    threading.Thread(target=warm_up, daemon=True).start()
+    if ASYNC_MODE:
+        from gevent.pywsgi import WSGIServer
+        print("Async mode: serving on gevent")
+        WSGIServer(('0.0.0.0', 5000), app).serve_forever()
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
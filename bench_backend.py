@@ -0,0 +1,150 @@
+"""
+Concurrent-session throughput benchmark for the Flask backend.
+
+Starts many interview sessions in parallel against a running backend and
+reports completed turns per second and per-turn latency. Every timed turn
+calls the model. Run it once against the threaded server and once against
+async mode to compare.
+
+Without a Groq key (or to keep the provider out of the numbers), start the
+stub model server, a Groq-compatible endpoint that answers after a fixed
+delay, and point the backend at it:
+
+    python bench_backend.py --stub-llm --stub-latency 1.0 --stub-port 8099
+    GROQ_API_BASE=http://127.0.0.1:8099 GROQ_API_KEY=stub python backend_api.py            # threaded
+    GROQ_API_BASE=http://127.0.0.1:8099 GROQ_API_KEY=stub python backend_api.py --async    # gevent
+    python bench_backend.py --sessions 200 --turns 3
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def post(url, payload, timeout):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def run_session(base_url, role, turns, timeout, latencies, errors, lock):
+    session_id = f"bench-{uuid.uuid4().hex[:12]}"
+    try:
+        post(f"{base_url}/api/start", {"session_id": session_id}, timeout)
+        # The role is the first message; that turn resolves it locally and is not timed
+        post(f"{base_url}/api", {"message": role, "session_id": session_id}, timeout)
+        # The next message gets a question; later ones answer it (correction + follow-up)
+        for turn in range(turns):
+            message = "start" if turn == 0 else "I would use a hash map to get constant time lookups."
+            started = time.perf_counter()
+            reply = post(f"{base_url}/api", {"message": message, "session_id": session_id}, timeout)
+            if reply.get("status") != "success" or reply.get("state") not in ("interviewing", "completed"):
+                raise RuntimeError(f"Turn did not reach the model: {reply.get('response') or reply.get('error')}")
+            with lock:
+                latencies.append(time.perf_counter() - started)
+    except Exception as e:
+        with lock:
+            errors.append(str(e))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(p * len(values)), len(values) - 1)]
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Groq (OpenAI-style) chat completions that arrive after a fixed delay."""
+
+    latency = 1.0
+    counter = itertools.count(1)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        number = next(self.counter)
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        if "question" in prompt.lower():
+            text = f"Explain the design trade-offs you would weigh in scenario {number}, including memory and latency."
+        else:
+            text = "I would use a hash map to get constant time lookups."
+        reply = {
+            "id": f"stub-{number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        }
+        if body.get("stream"):
+            chunk = dict(reply, object="chat.completion.chunk",
+                         choices=[{"index": 0, "delta": {"role": "assistant", "content": text}, "finish_reason": "stop"}])
+            data = f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode("utf-8")
+            content_type = "text/event-stream"
+        else:
+            data = json.dumps(reply).encode("utf-8")
+            content_type = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub_llm(port, latency):
+    StubLLMHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubLLMHandler)
+    server.daemon_threads = True
+    print(f"Stub LLM on http://127.0.0.1:{port} ({latency:.2f}s per call)")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure concurrent interview throughput.")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent interview sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--role", default="Data Analyst")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--stub-llm", action="store_true", help="Run the stub model server instead of a benchmark")
+    parser.add_argument("--stub-port", type=int, default=8099)
+    parser.add_argument("--stub-latency", type=float, default=1.0, help="Seconds the stub takes per call")
+    args = parser.parse_args()
+
+    if args.stub_llm:
+        serve_stub_llm(args.stub_port, args.stub_latency)
+        return
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        for _ in range(args.sessions):
+            pool.submit(run_session, args.url, args.role, args.turns, args.timeout, latencies, errors, lock)
+    elapsed = time.perf_counter() - started
+
+    print(f"Sessions: {args.sessions}, turns per session: {args.turns}")
+    print(f"Completed turns: {len(latencies)} in {elapsed:.1f}s ({len(latencies) / elapsed:.2f} turns/s)")
+    if latencies:
+        print(f"Turn latency p50: {percentile(latencies, 0.5):.2f}s  p95: {percentile(latencies, 0.95):.2f}s")
+    if errors:
+        print(f"Failed sessions: {len(errors)} (first error: {errors[0]})")
+
+
+if __name__ == "__main__":
+    main()
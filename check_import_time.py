@@ -0,0 +1,94 @@
+"""
+Import-time budget check for the entry points.
+
+Imports each entry point in a fresh interpreter with `python -X importtime`,
+then fails if the import takes longer than its budget or pulls in one of the
+heavy stacks that should only load on first use (LangChain, Groq, Whisper,
+torch, TTS/audio). Run it from the repository root, e.g. in CI:
+
+    python check_import_time.py
+    python check_import_time.py --budget-scale 2 --top 15
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INTERVIEW_DIR = os.path.join(ROOT, "interview")
+
+# (name, module to import, working directory, budget in ms)
+ENTRY_POINTS = [
+    ("backend_api", "backend_api", ROOT, 1500),
+    ("interview/main.py", "main", INTERVIEW_DIR, 400),
+]
+
+# Top-level packages that must not load at import time
+DEFERRED_PACKAGES = [
+    "langchain", "langchain_core", "langchain_groq", "groq",
+    "whisper", "torch", "speech_recognition", "edge_tts", "pygame",
+]
+
+
+def measure(module, cwd):
+    """Returns ({module: (self_us, cumulative_us)}, total_us) for importing `module`."""
+    env = dict(os.environ, PYTHONPATH=cwd)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    imports, total_us = {}, 0
+    for line in result.stderr.splitlines():
+        # "import time:       self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        indent = len(name) - len(name.lstrip())
+        name = name.strip()
+        imports[name] = (int(self_us), int(cumulative_us))
+        # Top-level imports (one leading space) add up to the whole import
+        if indent == 1:
+            total_us += int(cumulative_us)
+    return imports, total_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check entry point import times against a budget.")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget, e.g. on slow CI machines")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports of each entry point")
+    args = parser.parse_args()
+
+    failed = False
+    for name, module, cwd, budget_ms in ENTRY_POINTS:
+        budget_ms *= args.budget_scale
+        try:
+            imports, total_us = measure(module, cwd)
+        except RuntimeError as e:
+            print(f"FAIL {name}: {e}")
+            failed = True
+            continue
+
+        heavy = sorted({m.split(".")[0] for m in imports} & set(DEFERRED_PACKAGES))
+        over_budget = total_us / 1000 > budget_ms
+        status = "FAIL" if heavy or over_budget else "ok"
+        failed = failed or status == "FAIL"
+
+        print(f"{status:4} {name}: {total_us / 1000:.0f} ms (budget {budget_ms:.0f} ms)")
+        if heavy:
+            print(f"     imports deferred packages at startup: {', '.join(heavy)}")
+        slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for module_name, (self_us, _) in slowest:
+            print(f"     {self_us / 1000:8.1f} ms  {module_name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
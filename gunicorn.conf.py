@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for the backend (Linux/macOS):
+
+    gunicorn -c gunicorn.conf.py backend_api:app
+
+The app is imported and warmed up once in the master, then workers fork from
+it and share the already-imported modules copy-on-write instead of each
+paying the import cost. Interview sessions live in worker memory, so with
+more than one worker the load balancer must route each session to the same
+worker (sticky sessions).
+"""
+
+import gc
+import os
+
+bind = os.getenv("BACKEND_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("BACKEND_WORKERS", 1))
+preload_app = True
+
+if os.getenv("BACKEND_ASYNC", "0") == "1":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("BACKEND_WORKER_CONNECTIONS", 1000))
+else:
+    worker_class = "gthread"
+    threads = int(os.getenv("BACKEND_THREADS", 16))
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before workers fork
+    import backend_api
+
+    backend_api.warm_up()
+    # Keep the garbage collector from touching (and so copying) the shared
+    # objects in every worker
+    gc.freeze()
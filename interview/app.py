@@ -1,6 +1,257 @@
+"""
+Streamlit front end for voice interviews:
+
+    cd interview
+    streamlit run app.py
+
+Streamlit re-runs this script on every interaction, so nothing expensive
+happens in the script itself. The Whisper model and the LLM router are
+process-wide and start loading once per server (engine()); each interview's
+InterviewManager and state machine live in st.session_state; and
+transcription, LLM calls and speech synthesis run on a shared thread pool.
+A rerun only draws the page and picks up finished work.
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-from main import run_interview
 
-st.title("AI Interview Practice Partner 🎤")
-if st.button("Start Interview"):
-    run_interview()
+from interview import InterviewManager
+from feedback import generate_feedback_v2
+from model_router import get_default_router
+from role_catalog import catalog
+from voice import preload_model, transcribe_wav, synthesize_speech
+
+DIFFICULTY_LEVELS = ["Easy", "Easy", "Medium", "Medium", "Medium", "Medium", "Hard", "Hard", "Hard", "Hard"]
+POLL_SECONDS = 0.5
+
+
+@st.cache_resource
+def engine():
+    """
+    Shared by every session of this server process: the worker pool for slow
+    steps. The Whisper model and the LLM clients start loading here, in the
+    background, so they are ready by the time they are first needed.
+    """
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="interview")
+    preload_model()
+    executor.submit(get_default_router)
+    return executor
+
+
+# Background jobs. They run on the pool, never touch st.*, and return a dict
+# that apply_result() folds into the session state on the next rerun.
+
+def speech_for(text, voice_enabled):
+    if not voice_enabled:
+        return None
+    try:
+        return synthesize_speech(text)
+    except Exception as e:
+        print(f"(TTS Error: {e})")
+        return None
+
+
+def start_job(session_id, role_text, role_audio, voice_enabled):
+    if role_audio is not None:
+        role_text = transcribe_wav(role_audio)
+        if not role_text:
+            return {"retry": "I couldn't catch that. Could you please repeat the job role?"}
+
+    manager = InterviewManager(session_id=session_id)
+    # Known roles resolve locally; only unknown ones need LLM correction
+    match = catalog.resolve_or_correct(
+        role_text,
+        lambda raw: manager.correct_transcription(raw, "Job Role Selection", call_type="role_correction", fallback=False)
+    )
+    manager.set_role(match.name)
+    manager.set_topic(match.topic)
+
+    intro = f"Great! I'll focus on the core concepts and topics relevant to {match.name}. Let's begin the interview."
+    question = manager.generate_question(DIFFICULTY_LEVELS[0])
+    return {
+        "manager": manager,
+        "role": match.name,
+        "topic": match.topic,
+        "intro": intro,
+        "question": question,
+        "is_followup": False,
+        "level": 0,
+        "speech": speech_for(f"{intro} {question}", voice_enabled),
+    }
+
+
+def answer_job(manager, question, is_followup, level, answer_text, answer_audio, voice_enabled):
+    if answer_audio is not None:
+        answer_text = transcribe_wav(answer_audio)
+        if not answer_text:
+            retry = "I couldn't catch that. Could you please repeat your answer?"
+            return {"retry": retry, "speech": speech_for(retry, voice_enabled)}
+        answer_text = manager.correct_transcription(answer_text, f"Answer to interview question: {question}")
+
+    manager.record_interaction(question, answer_text)
+    result = {"answer": answer_text}
+
+    # One follow-up after each main question, then the next difficulty level
+    if not is_followup:
+        followup = manager.generate_question(
+            DIFFICULTY_LEVELS[level],
+            is_followup=True,
+            previous_question=question,
+            previous_answer=answer_text
+        )
+        if followup and followup.strip():
+            result.update(question=followup, is_followup=True, level=level,
+                          speech=speech_for(followup, voice_enabled))
+            return result
+
+    level += 1
+    if level >= len(DIFFICULTY_LEVELS):
+        result["feedback"] = generate_feedback_v2(
+            manager.get_transcript_text(), manager.role, manager.topic, session_id=manager.session_id
+        )
+        result["speech"] = speech_for("That concludes the interview. Your feedback is on the screen.", voice_enabled)
+        return result
+
+    question = manager.generate_question(DIFFICULTY_LEVELS[level])
+    result.update(question=question, is_followup=False, level=level,
+                  speech=speech_for(f"Thank you. Let's move to the next question. {question}", voice_enabled))
+    return result
+
+
+# Session state machine: setup -> working -> answering -> working -> ... -> done
+
+def reset_state():
+    st.session_state.update({
+        "phase": "setup",
+        "session_id": f"streamlit-{uuid.uuid4().hex[:12]}",
+        "manager": None,
+        "role": None,
+        "question": None,
+        "is_followup": False,
+        "level": 0,
+        "chat": [],
+        "job": None,
+        "speech": None,
+        "feedback": None,
+        "error": None,
+        "turn": 0,
+    })
+
+
+def submit(fn, *args):
+    st.session_state.job = engine().submit(fn, *args)
+    st.session_state.error = None
+    st.session_state.phase = "working"
+    st.session_state.turn += 1  # fresh recorder widgets for the next input
+
+
+def apply_result():
+    """Folds a finished background job into the session state."""
+    state = st.session_state
+    job = state.job
+    if job is None or not job.done():
+        return
+    state.job = None
+
+    try:
+        result = job.result()
+    except Exception as e:
+        state.error = str(e)
+        state.phase = "answering" if state.manager else "setup"
+        return
+
+    if "retry" in result:
+        state.chat.append(("assistant", result["retry"]))
+        state.speech = result.get("speech")
+        state.phase = "answering" if state.manager else "setup"
+        return
+
+    if "manager" in result:
+        state.manager = result["manager"]
+        state.role = result["role"]
+        state.chat.append(("assistant", result["intro"]))
+    if "answer" in result:
+        state.chat.append(("user", result["answer"]))
+    state.speech = result.get("speech")
+
+    if "feedback" in result:
+        state.feedback = result["feedback"]
+        state.phase = "done"
+        return
+
+    state.question = result["question"]
+    state.is_followup = result["is_followup"]
+    state.level = result["level"]
+    state.chat.append(("assistant", result["question"]))
+    state.phase = "answering"
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def job_status():
+    # Only this fragment re-runs while a job is pending; the page re-runs once it is done
+    job = st.session_state.job
+    if job is None or job.done():
+        st.rerun()
+    st.caption("Zyra is thinking...")
+
+
+def render():
+    state = st.session_state
+    st.title("AI Interview Practice Partner 🎤")
+
+    with st.sidebar:
+        voice_enabled = st.toggle("Speak questions aloud", value=True)
+        if state.role:
+            st.write(f"**Role:** {state.role}")
+            st.write(f"**Question level:** {min(state.level + 1, len(DIFFICULTY_LEVELS))} of {len(DIFFICULTY_LEVELS)} ({DIFFICULTY_LEVELS[min(state.level, len(DIFFICULTY_LEVELS) - 1)]})")
+        if st.button("Restart interview"):
+            reset_state()
+            st.rerun()
+
+    for speaker, text in state.chat:
+        with st.chat_message(speaker):
+            st.write(text)
+    if state.speech:
+        st.audio(state.speech, format="audio/mp3", autoplay=True)
+    if state.error:
+        st.error(state.error)
+
+    if state.phase == "setup":
+        st.write("Hi! I'm Zyra, your AI interview coach. Which job role are you applying for?")
+        role_text = st.text_input("Job role", placeholder="e.g. Backend Developer, Sales Representative")
+        role_audio = st.audio_input("Or say it", key=f"role-audio-{state.turn}")
+        if role_audio is not None:
+            submit(start_job, state.session_id, None, role_audio.getvalue(), voice_enabled)
+            st.rerun()
+        if st.button("Start interview", type="primary", disabled=not role_text.strip()):
+            submit(start_job, state.session_id, role_text.strip(), None, voice_enabled)
+            st.rerun()
+
+    elif state.phase == "working":
+        job_status()
+
+    elif state.phase == "answering":
+        answer_audio = st.audio_input("Record your answer", key=f"answer-audio-{state.turn}")
+        answer_text = st.chat_input("Or type your answer")
+        if answer_audio is not None or answer_text:
+            submit(
+                answer_job, state.manager, state.question, state.is_followup, state.level,
+                answer_text, answer_audio.getvalue() if answer_audio is not None else None, voice_enabled
+            )
+            st.rerun()
+
+    elif state.phase == "done":
+        st.subheader("Feedback")
+        st.markdown(state.feedback)
+        if st.button("Start a new interview", type="primary"):
+            reset_state()
+            st.rerun()
+
+
+engine()
+if "phase" not in st.session_state:
+    reset_state()
+apply_result()
+render()
@@ -0,0 +1,254 @@
+"""
+Batch re-grading of stored interview transcripts.
+
+Streams transcripts from a directory (*.txt / *.json) or a JSONL file, runs
+generate_feedback_v2 on them with bounded concurrency, and appends results to
+a JSONL output file as they finish. Transcripts already graded in the output
+file are skipped, so an interrupted run can simply be restarted.
+
+Usage (from the interview/ directory):
+    python batch_feedback.py transcripts/ -o feedback.jsonl --workers 4 --rpm 30
+    python batch_feedback.py transcripts.jsonl -o feedback.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from dotenv import load_dotenv
+from feedback import generate_feedback_v2
+from llm_cache import default_cache
+from model_router import parse_retry_after
+
+load_dotenv()
+
+
+def render_transcript(transcript):
+    """Accepts either ready-made transcript text or a list of [question, answer] pairs."""
+    if isinstance(transcript, str):
+        return transcript
+    text = ""
+    for q, a in transcript:
+        text += f"Q: {q}\nA: {a}\n\n"
+    return text
+
+
+def parse_record(text, record_id, default_role, default_topic):
+    """
+    Parses one JSON transcript record. A malformed one comes back as
+    { id, invalid } so it is reported as an error instead of stopping the batch.
+    """
+    try:
+        record = json.loads(text)
+    except ValueError as e:
+        return {"id": record_id, "invalid": f"Invalid JSON: {e}"}
+    if not isinstance(record, dict):
+        return {"id": record_id, "invalid": "Expected a JSON object"}
+    record.setdefault("id", record_id)
+    record.setdefault("role", default_role)
+    record.setdefault("topic", default_topic)
+    return record
+
+
+def iter_transcripts(source, default_role, default_topic):
+    """
+    Yields { id, transcript, role, topic } records one at a time. Records
+    without a role or topic get the defaults.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            stem, ext = os.path.splitext(name)
+            if ext == ".txt":
+                with open(path, "r", encoding="utf-8") as f:
+                    yield {"id": stem, "transcript": f.read(), "role": default_role, "topic": default_topic}
+            elif ext == ".json":
+                with open(path, "r", encoding="utf-8") as f:
+                    yield parse_record(f.read(), stem, default_role, default_topic)
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                yield parse_record(line, str(line_number), default_role, default_topic)
+
+
+def load_checkpoint(output_path):
+    """Returns the ids already graded successfully in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # partially written line from an interrupted run
+            if result.get("status") == "ok":
+                done.add(str(result["id"]))
+    return done
+
+
+class RateLimiter:
+    """
+    Spaces out request starts to stay under a requests-per-minute limit, and lets
+    any worker pause every worker after the API reports a rate limit.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot, self._paused_until)
+            self._next_slot = start + self.interval
+        time.sleep(max(start - time.monotonic(), 0))
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class ResultWriter:
+    """Appends one JSON line per result and syncs it to disk immediately."""
+
+    def __init__(self, output_path):
+        self._file = open(output_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, result):
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def grade(record, limiter, max_retries, base_delay):
+    """Runs feedback generation for one record, retrying with backoff."""
+    if "invalid" in record:
+        return {"id": record["id"], "status": "error", "error": record["invalid"], "attempts": 0}
+    try:
+        transcript = render_transcript(record["transcript"])
+    except KeyError:
+        return {"id": record["id"], "status": "error", "error": "Missing transcript", "attempts": 0}
+    except (TypeError, ValueError) as e:
+        return {"id": record["id"], "status": "error", "error": f"Invalid transcript: {e}", "attempts": 0}
+    attempt = 0
+    while True:
+        limiter.acquire()
+        started = time.time()
+        try:
+            feedback = generate_feedback_v2(
+                transcript, record.get("role"), record.get("topic"),
+                session_id=f"batch:{record['id']}"
+            )
+            return {
+                "id": record["id"],
+                "role": record.get("role"),
+                "topic": record.get("topic"),
+                "feedback": feedback,
+                "status": "ok",
+                "attempts": attempt + 1,
+                "seconds": round(time.time() - started, 2)
+            }
+        except Exception as e:
+            error_str = str(e)
+            if attempt >= max_retries:
+                return {"id": record["id"], "status": "error", "error": error_str, "attempts": attempt + 1}
+
+            retry_after = parse_retry_after(error_str)
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            if retry_after is not None:
+                # Rate limited: stop every worker, not just this one
+                delay = max(delay, retry_after)
+                limiter.pause(delay)
+            attempt += 1
+            time.sleep(delay)
+
+
+def run_batch(source, output_path, workers=4, requests_per_minute=30, max_retries=5,
+              base_delay=2.0, default_role=None, default_topic=None):
+    """
+    Grades every transcript in `source` not already in `output_path`.
+    Returns (succeeded, failed, skipped) counts.
+    """
+    done = load_checkpoint(output_path)
+    limiter = RateLimiter(requests_per_minute)
+    writer = ResultWriter(output_path)
+    counts = {"ok": 0, "error": 0}
+    skipped = 0
+
+    def collect(result):
+        writer.write(result)
+        counts[result["status"]] += 1
+        print(f"[{result['status']}] {result['id']}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for record in iter_transcripts(source, default_role, default_topic):
+                record["id"] = str(record["id"])
+                if record["id"] in done:
+                    skipped += 1
+                    continue
+
+                # Keep only a small window of work in flight so large inputs stream
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        collect(future.result())
+
+                pending.add(pool.submit(grade, record, limiter, max_retries, base_delay))
+
+            for future in pending:
+                collect(future.result())
+    finally:
+        writer.close()
+
+    return counts["ok"], counts["error"], skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-grade stored interview transcripts in parallel.")
+    parser.add_argument("source", help="Directory of .txt/.json transcripts or a .jsonl file")
+    parser.add_argument("-o", "--output", default="feedback_results.jsonl", help="JSONL output (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent LLM calls")
+    parser.add_argument("--rpm", type=int, default=30, help="Maximum requests per minute (0 for no limit)")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--role", default=None, help="Role for transcripts that do not specify one")
+    parser.add_argument("--topic", default=None, help="Topic for transcripts that do not specify one")
+    args = parser.parse_args(argv)
+
+    if not os.getenv("GROQ_API_KEY") and default_cache.mode != "replay":
+        print(" Error: GROQ_API_KEY not found in .env file.")
+        return 1
+
+    started = time.time()
+    succeeded, failed, skipped = run_batch(
+        args.source, args.output,
+        workers=args.workers,
+        requests_per_minute=args.rpm,
+        max_retries=args.max_retries,
+        default_role=args.role,
+        default_topic=args.topic
+    )
+    print(f"\nDone in {time.time() - started:.1f}s: {succeeded} graded, {failed} failed, {skipped} already done.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
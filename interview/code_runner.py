@@ -0,0 +1,370 @@
+"""
+Sandboxed code runner for developer interviews.
+
+Runs a candidate's solution in a separate `python -I -S` process with CPU,
+memory, file-size and process limits (POSIX) and a wall-clock timeout. The
+solution is checked against the Input/Output examples in the question, then
+benchmarked on the first example scaled to growing input sizes; the measured
+time and peak-memory growth are fitted to the usual complexity classes.
+
+Running code is off unless CODE_RUNNER_ENABLED is set. The process is isolated
+from the app tree (which holds .env and the API key) by CODE_RUNNER_SANDBOX:
+
+    bwrap  (default) a bubblewrap namespace with only the Python install,
+           a private /tmp and the job directory; no network
+    user   a separate unprivileged account (CODE_RUNNER_USER, default
+           nobody); the backend must run as root and .env must not be
+           readable by that account
+    none   no isolation, for when the backend already runs in a throwaway
+           container
+"""
+
+import os
+import re
+import ast
+import sys
+import json
+import math
+import shutil
+import signal
+import stat
+import tempfile
+import threading
+import subprocess
+
+try:
+    import pwd
+except ImportError:  # Windows
+    pwd = None
+
+from sandbox_harness import RESULT_PREFIX
+
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_harness.py")
+
+TIMEOUT_SECONDS = float(os.getenv("CODE_RUNNER_TIMEOUT", 15))
+MEMORY_MB = int(os.getenv("CODE_RUNNER_MEMORY_MB", 512))
+BENCHMARK_SECONDS = float(os.getenv("CODE_RUNNER_BENCHMARK_SECONDS", 5))
+MAX_CODE_CHARS = 20000
+ENABLED = os.getenv("CODE_RUNNER_ENABLED", "").lower() in ("1", "true", "yes")
+SANDBOX = os.getenv("CODE_RUNNER_SANDBOX", "bwrap").lower()
+SANDBOX_USER = os.getenv("CODE_RUNNER_USER", "nobody")
+# Interpreter for the sandbox, e.g. /usr/bin/python3 when the backend's own Python is not readable there
+SANDBOX_PYTHON = os.getenv("CODE_RUNNER_PYTHON")
+# Browser origins allowed to run code; requests without an Origin (curl, tests) are allowed
+ALLOWED_ORIGINS = [o.strip() for o in os.getenv(
+    "CODE_RUNNER_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",") if o.strip()]
+# Files that must stay out of reach of the sandbox
+SECRET_FILES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"),
+]
+
+# Caps concurrent sandboxes across all sessions
+_slots = threading.BoundedSemaphore(int(os.getenv("CODE_RUNNER_CONCURRENCY", 4)))
+
+EXAMPLE_RE = re.compile(
+    r"Input:\s*(?P<input>.+?)\s*Output:\s*(?P<output>.+?)"
+    r"(?=\n\s*\n|\n\s*(?:Explanation|Example|Input|Constraints|Note)\b|\Z)",
+    re.S | re.I,
+)
+
+# (label, growth function); ordered from slowest-growing
+COMPLEXITY_CLASSES = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: n ** 2),
+    ("O(n^3)", lambda n: n ** 3),
+]
+MIN_FIT_POINTS = 4
+
+
+def parse_arguments(text):
+    """
+    Parses an example input as call arguments:
+    'nums = [2, 7, 11, 15], target = 9' -> ([], {'nums': [...], 'target': 9})
+    Returns None if the input is not made of Python/JSON literals.
+    """
+    text = text.strip().rstrip(".")
+    text = re.sub(r"\btrue\b", "True", re.sub(r"\bfalse\b", "False", re.sub(r"\bnull\b", "None", text)))
+    try:
+        call = ast.parse(f"f({text})", mode="eval").body
+        args = [ast.literal_eval(a) for a in call.args]
+        kwargs = {k.arg: ast.literal_eval(k.value) for k in call.keywords}
+    except (SyntaxError, ValueError):
+        return None
+    return args, kwargs
+
+
+def parse_examples(question):
+    """Extracts runnable tests from the "Input: ... Output: ..." examples of a question."""
+    tests = []
+    for match in EXAMPLE_RE.finditer(question or ""):
+        parsed = parse_arguments(match.group("input"))
+        if parsed is None:
+            continue
+        expected = parse_arguments(match.group("output"))
+        tests.append({
+            "input": match.group("input").strip(),
+            "args": parsed[0],
+            "kwargs": parsed[1],
+            # Prose outputs ("3 (the length of ...)") are run but not checked
+            "expected": expected[0][0] if expected and len(expected[0]) == 1 and not expected[1] else None,
+        })
+    return tests
+
+
+def fit_complexity(points, key):
+    """
+    Fits measurements to t = c * f(n) in log space and returns the label of the
+    best-fitting class, or None with too few points or sizes. Ties go to the slower-growing class.
+    """
+    points = [(p["n"], p[key]) for p in points if p.get(key, 0) > 0 and p["n"] > 1]
+    if len(points) < MIN_FIT_POINTS or len({n for n, _ in points}) < MIN_FIT_POINTS:
+        return None
+    # Less than 2x over the whole range is flat; timer noise would otherwise fit O(log n),
+    # which grows 2.4x from n=128 to n=131072
+    values = [value for _, value in sorted(points)]
+    if max(values[-2:]) < 2 * min(values[:2]):
+        return "O(1)"
+    best_label, best_error = None, None
+    for label, growth in COMPLEXITY_CLASSES:
+        residuals = [math.log(value) - math.log(growth(n)) for n, value in points]
+        mean = sum(residuals) / len(residuals)
+        error = sum((r - mean) ** 2 for r in residuals) / len(residuals)
+        if best_error is None or error < best_error * 0.9:
+            best_label, best_error = label, error
+    return best_label
+
+
+class SandboxUnavailable(Exception):
+    """The configured sandbox cannot be used, so no code is run."""
+
+
+def origin_allowed(origin):
+    return not origin or origin in ALLOWED_ORIGINS
+
+
+def _python():
+    # The real interpreter, not a venv symlink that may live inside the app tree
+    return os.path.realpath(SANDBOX_PYTHON or getattr(sys, "_base_executable", None) or sys.executable)
+
+
+def _bwrap_command(workdir, harness):
+    bwrap = shutil.which("bwrap")
+    if bwrap is None:
+        raise SandboxUnavailable("The code runner needs bubblewrap (bwrap) installed, or set CODE_RUNNER_SANDBOX")
+    python = _python()
+    command = [
+        bwrap, "--unshare-all", "--die-with-parent", "--new-session",
+        "--ro-bind", "/usr", "/usr",
+        "--ro-bind-try", "/lib", "/lib", "--ro-bind-try", "/lib64", "/lib64",
+        "--ro-bind-try", "/bin", "/bin", "--ro-bind-try", "/etc/alternatives", "/etc/alternatives",
+    ]
+    for path in {sys.base_prefix, os.path.dirname(os.path.dirname(python))}:
+        if not path.startswith("/usr"):
+            command += ["--ro-bind", path, path]
+    command += [
+        "--proc", "/proc", "--dev", "/dev", "--tmpfs", "/tmp",
+        "--bind", workdir, "/sandbox", "--chdir", "/sandbox",
+        python, "-I", "-S", "/sandbox/" + os.path.basename(harness),
+    ]
+    return command
+
+
+def _sandbox_account():
+    if pwd is None or not hasattr(os, "getuid"):
+        raise SandboxUnavailable("CODE_RUNNER_SANDBOX=user is only supported on POSIX systems")
+    if os.getuid() != 0:
+        raise SandboxUnavailable("CODE_RUNNER_SANDBOX=user needs the backend to run as root")
+    try:
+        account = pwd.getpwnam(SANDBOX_USER)
+    except KeyError:
+        raise SandboxUnavailable(f"Sandbox user '{SANDBOX_USER}' does not exist")
+    if account.pw_uid == 0:
+        raise SandboxUnavailable("CODE_RUNNER_USER must not be root")
+    for path in SECRET_FILES:
+        if not os.path.exists(path):
+            continue
+        info = os.stat(path)
+        if info.st_uid == account.pw_uid or info.st_mode & stat.S_IROTH or (
+                info.st_gid == account.pw_gid and info.st_mode & stat.S_IRGRP):
+            raise SandboxUnavailable(f"{path} is readable by the sandbox user; chmod 600 it first")
+    return account
+
+
+def _sandbox_process(workdir):
+    """Popen keyword arguments that start the harness inside the configured sandbox."""
+    # The harness runs from the job directory, so the sandbox never needs the app tree
+    harness = shutil.copy(HARNESS_PATH, workdir)
+    kwargs = {"cwd": workdir, "start_new_session": hasattr(os, "killpg")}
+    if SANDBOX == "bwrap":
+        kwargs["args"] = _bwrap_command(workdir, harness)
+    elif SANDBOX == "user":
+        account = _sandbox_account()
+        os.chown(workdir, account.pw_uid, account.pw_gid)
+        kwargs.update(args=[_python(), "-I", "-S", harness],
+                      user=account.pw_uid, group=account.pw_gid, extra_groups=[])
+    elif SANDBOX == "none":
+        kwargs["args"] = [_python(), "-I", "-S", harness]
+    else:
+        raise SandboxUnavailable(f"Unknown CODE_RUNNER_SANDBOX '{SANDBOX}', expected bwrap, user or none")
+    return kwargs
+
+
+def _kill(process):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+def _sandbox_env():
+    env = {"PATH": os.environ.get("PATH", "")}
+    if "SYSTEMROOT" in os.environ:  # needed by Python on Windows
+        env["SYSTEMROOT"] = os.environ["SYSTEMROOT"]
+    return env
+
+
+def run_solution(code, question=None, tests=None, entry_point=None, benchmark=True,
+                 timeout=None, memory_mb=None):
+    """
+    Runs `code` against `tests` (default: the examples parsed from `question`)
+    and benchmarks it on the first test scaled up.
+    Returns a JSON-serializable result dict. Raises SandboxUnavailable if the
+    sandbox is not set up.
+    """
+    timeout = timeout or TIMEOUT_SECONDS
+    memory_mb = memory_mb or MEMORY_MB
+    tests = tests if tests is not None else parse_examples(question)
+    if len(code) > MAX_CODE_CHARS:
+        result = _collect("", "", 0, False, tests)
+        result["status"], result["error"] = "error", f"Code is longer than {MAX_CODE_CHARS} characters"
+        return result
+
+    job = {
+        "code": code,
+        "entry_point": entry_point,
+        # Applied by the harness itself before it runs the code
+        "limits": {"memory_mb": memory_mb, "cpu_seconds": int(math.ceil(timeout))},
+        "tests": [{"args": t.get("args", []), "kwargs": t.get("kwargs", {}), "expected": t.get("expected")} for t in tests],
+    }
+    if benchmark and tests:
+        job["benchmark"] = {
+            "example": {"args": tests[0].get("args", []), "kwargs": tests[0].get("kwargs", {})},
+            "max_seconds": min(BENCHMARK_SECONDS, timeout / 2),
+        }
+
+    timed_out = False
+    with _slots, tempfile.TemporaryDirectory(prefix="code-run-") as workdir:
+        try:
+            process = subprocess.Popen(
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=_sandbox_env(),
+                text=True,
+                **_sandbox_process(workdir)
+            )
+        except OSError as e:
+            raise SandboxUnavailable(f"Could not start the sandbox ({e}); see CODE_RUNNER_PYTHON")
+        try:
+            stdout, stderr = process.communicate(json.dumps(job), timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill(process)
+            stdout, stderr = process.communicate()
+
+    return _collect(stdout, stderr, process.returncode, timed_out, tests)
+
+
+def _collect(stdout, stderr, returncode, timed_out, tests):
+    events = []
+    for line in stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            try:
+                events.append(json.loads(line[len(RESULT_PREFIX):]))
+            except ValueError:
+                pass
+
+    result = {
+        "status": "ok",
+        "error": None,
+        "entry_point": None,
+        "tests": [{"input": t.get("input"), "expected": t.get("expected"), "passed": None} for t in tests],
+        "benchmark": [],
+        "max_rss_kb": None,
+    }
+    finished = False
+    for event in events:
+        kind = event.pop("event")
+        if kind == "fatal":
+            result["status"], result["error"] = event["status"], event["error"]
+        elif kind == "entry_point":
+            result["entry_point"] = event["name"]
+        elif kind == "test" and event["index"] < len(result["tests"]):
+            result["tests"][event.pop("index")].update(event)
+        elif kind == "point":
+            result["benchmark"].append(event)
+        elif kind == "benchmark_skipped":
+            result["benchmark_skipped"] = event["reason"]
+        elif kind == "benchmark_error":
+            result["benchmark_error"] = f"At n={event['n']}: {event['error']}"
+        elif kind == "memory":
+            result["max_rss_kb"] = event["max_rss_kb"]
+        elif kind == "done":
+            finished = True
+
+    if result["status"] == "ok" and not finished:
+        if timed_out or returncode in (-getattr(signal, "SIGXCPU", 24), -signal.SIGKILL):
+            result["status"], result["error"] = "timeout", "Time limit exceeded"
+        elif "MemoryError" in stderr:
+            result["status"], result["error"] = "memory_limit", "Memory limit exceeded"
+        else:
+            result["status"], result["error"] = "error", (stderr.strip().splitlines() or ["Solution process crashed"])[-1]
+
+    # Tests that never ran (crash or timeout) count as failed
+    result["passed"] = sum(1 for t in result["tests"] if t["passed"])
+    result["checked"] = sum(1 for t in result["tests"] if t["expected"] is not None)
+    result["time_complexity"] = fit_complexity(result["benchmark"], "seconds")
+    result["space_complexity"] = fit_complexity(result["benchmark"], "peak_bytes")
+    return result
+
+
+def summarize(result, question=None):
+    """One-paragraph plain-text summary of a run, for the feedback prompt."""
+    name = result.get("entry_point") or "solution"
+    lines = []
+    if question:
+        lines.append(f"Problem: {question.strip().splitlines()[0][:200]}")
+    if result["status"] in ("syntax_error", "error") and result["entry_point"] is None:
+        lines.append(f"Code did not run: {result['error']}")
+        return "\n".join(lines)
+
+    lines.append(f"{name}: {result['passed']}/{result['checked']} example tests passed")
+    for test in result["tests"]:
+        if test.get("error"):
+            lines.append(f"  Input {test['input']} raised {test['error']}")
+        elif test["passed"] is False:
+            lines.append(f"  Input {test['input']}: expected {test['expected']}, got {test.get('actual')}")
+    if result["status"] != "ok":
+        lines.append(f"Run stopped: {result['error']}")
+
+    points = result["benchmark"]
+    if points:
+        last = points[-1]
+        lines.append(
+            f"Benchmark: n={points[0]['n']}..{last['n']}, {last['seconds'] * 1000:.2f} ms and "
+            f"{last['peak_bytes'] / 1024:.0f} KiB extra memory at n={last['n']}"
+        )
+        if result["time_complexity"]:
+            lines.append(f"Measured time complexity ~{result['time_complexity']}, extra space ~{result['space_complexity']}")
+    if result.get("benchmark_skipped"):
+        lines.append(f"Complexity not measured: {result['benchmark_skipped']}")
+    if result.get("benchmark_error"):
+        lines.append(f"Benchmark failed {result['benchmark_error']}")
+    return "\n".join(lines)
@@ -1,6 +1,7 @@
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_groq import ChatGroq
-import os
+from token_ledger import ledger
+from model_router import get_default_router
+from interview import load_prompt, build_messages
+from code_runner import summarize
 
 def generate_feedback(transcript_text):
     # Let's update the function signature to accept role and topic if needed, 
@@ -8,25 +9,21 @@ def generate_feedback(transcript_text):
     # Actually, the prompt expects {role} and {topic}. Let's update the signature.
     return "Error: Missing role and topic in function signature. Please update."
 
-def generate_feedback_v2(transcript_text, role, topic):
-    api_key = os.getenv("GROQ_API_KEY")
-    llm = ChatGroq(
-        temperature=0.5, 
-        model_name="llama-3.3-70b-versatile", 
-        groq_api_key=api_key
-    )
-    
-    prompt_template = open("prompts/feedback_prompt.txt", "r").read()
+def generate_feedback_v2(transcript_text, role, topic, session_id=None, code_results=None):
+    # `code_results` is a list of (question, code_runner result) for submitted solutions
+    if code_results:
+        runs = "\n\n".join(summarize(result, question) for question, result in code_results)
+        transcript_text = f"{transcript_text}\n\nCode execution results (measured by running the candidate's code):\n{runs}"
+
+    prompt_template = load_prompt("feedback_prompt.txt")
     system_prompt = prompt_template.format(
         role=role,
         topic=topic,
         transcript=transcript_text
     )
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content="Generate the feedback report.")
-    ]
+    messages = build_messages(system_prompt, "Generate the feedback report.")
     
-    response = llm.invoke(messages)
+    response = get_default_router().invoke("feedback", messages, 0.5)
+    ledger.record_response(session_id, "feedback", response, messages)
     return response.content
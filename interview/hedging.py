@@ -0,0 +1,226 @@
+"""
+Hedged requests for slow LLM calls.
+
+If a call has not returned after an adaptive threshold (a high percentile of
+recent latencies for the same call type), an identical backup request is sent
+and whichever finishes first is used. Hedges are capped to a fraction of calls
+so a slow provider cannot double our token spend.
+
+Streamed calls hedge on time to the first token instead: the request that
+streams first owns the stream, and the other one's tokens are dropped.
+
+Each primary request runs on a thread of its own, so it never waits for a
+pool slot (that wait would be timed as LLM latency and raise the threshold);
+only backups go through the bounded pool.
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Recent latencies / hedge decisions kept per call type
+WINDOW = 100
+
+
+class Hedger:
+    def __init__(self, percentile=0.9, min_samples=10, default_delay=4.0, max_hedge_rate=0.1, max_workers=32):
+        """
+        percentile      - latency percentile after which a hedge is sent
+        min_samples     - latencies needed before the percentile is trusted
+        default_delay   - hedge delay (seconds) until enough samples exist
+        max_hedge_rate  - maximum fraction of recent calls that may be hedged
+        max_workers     - backup requests in flight at once
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.max_hedge_rate = max_hedge_rate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._latencies = {}   # key -> deque of seconds
+        self._decisions = {}   # key -> deque of bool (was this call hedged)
+        self._stats = {}       # key -> counters
+
+    def _counters(self, key):
+        if key not in self._stats:
+            self._stats[key] = {"calls": 0, "hedges_issued": 0, "hedges_won": 0, "hedges_skipped": 0}
+            self._latencies[key] = deque(maxlen=WINDOW)
+            self._decisions[key] = deque(maxlen=WINDOW)
+        return self._stats[key]
+
+    def threshold(self, key):
+        """Seconds to wait for the primary request before hedging."""
+        with self._lock:
+            self._counters(key)
+            latencies = sorted(self._latencies[key])
+        if len(latencies) < self.min_samples:
+            return self.default_delay
+        return latencies[min(int(self.percentile * len(latencies)), len(latencies) - 1)]
+
+    def _record_latency(self, key, started, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            self._latencies[key].append(time.perf_counter() - started)
+
+    @staticmethod
+    def _start(fn, *args):
+        """Runs `fn(*args)` on a new thread and returns a Future for its result."""
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, name="hedge-primary", daemon=True).start()
+        return future
+
+    def _may_hedge(self, key):
+        decisions = self._decisions[key]
+        return sum(decisions) < max(1.0, self.max_hedge_rate * (len(decisions) + 1))
+
+    def call(self, key, fn, on_discard=None):
+        """
+        Runs `fn()` and returns its result, hedging with a second `fn()` if the
+        first is slower than the current threshold. `on_discard(result)` is
+        called with the losing response, if it succeeds, so its cost can be
+        accounted for.
+        """
+        delay = self.threshold(key)
+        started = time.perf_counter()
+        primary = self._start(fn)
+        # Latency samples come from primaries only, so hedging does not skew the threshold
+        primary.add_done_callback(lambda f: self._record_latency(key, started, f))
+
+        done, _ = wait([primary], timeout=delay)
+        with self._lock:
+            counters = self._counters(key)
+            counters["calls"] += 1
+            hedge_now = not done and self._may_hedge(key)
+            if not done and not hedge_now:
+                counters["hedges_skipped"] += 1
+            self._decisions[key].append(hedge_now)
+            if hedge_now:
+                counters["hedges_issued"] += 1
+
+        if not hedge_now:
+            return primary.result()
+
+        backup = self._executor.submit(fn)
+        pending = {primary, backup}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    first_error = first_error or future.exception()
+                    continue
+
+                winner = future
+                loser = backup if winner is primary else primary
+                if winner is backup:
+                    with self._lock:
+                        self._stats[key]["hedges_won"] += 1
+                if on_discard is not None:
+                    loser.add_done_callback(
+                        lambda f: on_discard(f.result()) if not f.cancelled() and f.exception() is None else None
+                    )
+                return winner.result()
+
+        raise first_error
+
+    def call_stream(self, key, fn, on_token, on_discard=None):
+        """
+        Like call() for a streamed response: `fn(forward)` streams text into
+        `forward` and returns the full response. A hedge is sent if the primary
+        has produced no token after the threshold for "<key>:first_token".
+        Only the request that streams first reaches `on_token`, and its
+        response is returned, even if the other request finishes earlier.
+        """
+        key = f"{key}:first_token"
+        delay = self.threshold(key)
+        started = time.perf_counter()
+        lock = threading.Lock()
+        changed = threading.Event()  # a token arrived or a request finished
+        owner = []
+
+        def streamer(index):
+            first = [True]
+
+            def forward(text):
+                if first[0]:
+                    first[0] = False
+                    if index == 0:
+                        # Latency samples come from primaries only, as in call()
+                        with self._lock:
+                            self._latencies[key].append(time.perf_counter() - started)
+                with lock:
+                    if not owner:
+                        owner.append(index)
+                        changed.set()
+                    owns = owner[0] == index
+                if owns:
+                    on_token(text)
+            return forward
+
+        with self._lock:
+            counters = self._counters(key)
+        futures = [self._start(fn, streamer(0))]
+        futures[0].add_done_callback(lambda f: changed.set())
+
+        changed.wait(timeout=delay)
+        with self._lock:
+            counters["calls"] += 1
+            waiting = not owner and not futures[0].done()
+            hedge_now = waiting and self._may_hedge(key)
+            if waiting and not hedge_now:
+                counters["hedges_skipped"] += 1
+            self._decisions[key].append(hedge_now)
+            if hedge_now:
+                counters["hedges_issued"] += 1
+        if not hedge_now:
+            return futures[0].result()
+
+        futures.append(self._executor.submit(fn, streamer(1)))
+        futures[1].add_done_callback(lambda f: changed.set())
+        while True:
+            changed.clear()
+            with lock:
+                winner = owner[0] if owner else None
+            if winner is None:
+                # A request that finished without streaming (an error or an empty response)
+                finished = [i for i, f in enumerate(futures) if f.done() and f.exception() is None]
+                if finished:
+                    winner = finished[0]
+                elif all(f.done() for f in futures):
+                    raise futures[0].exception()
+            if winner is not None:
+                break
+            changed.wait()
+
+        loser = futures[1 - winner]
+        if winner == 1:
+            with self._lock:
+                counters["hedges_won"] += 1
+        if on_discard is not None:
+            loser.add_done_callback(
+                lambda f: on_discard(f.result()) if not f.cancelled() and f.exception() is None else None
+            )
+        return futures[winner].result()
+
+    def stats(self):
+        with self._lock:
+            keys = list(self._stats)
+        report = {}
+        for key in keys:
+            threshold = self.threshold(key)
+            with self._lock:
+                report[key] = dict(self._stats[key], threshold_seconds=round(threshold, 3))
+        return report
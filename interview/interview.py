@@ -1,53 +1,132 @@
 import os
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
+import time
 from dotenv import load_dotenv
+from token_ledger import ledger as default_ledger
+from llm_cache import default_cache
+from model_router import get_default_router
+from question_index import QuestionIndex
+from transcript_log import Turn
 
 load_dotenv()
 
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+_prompt_cache = {}
+
+def load_prompt(name):
+    """
+    Reads a prompt template from the prompts/ directory next to this file,
+    independent of the current working directory. Templates are read once.
+    """
+    if name not in _prompt_cache:
+        with open(os.path.join(PROMPTS_DIR, name), "r", encoding="utf-8") as f:
+            _prompt_cache[name] = f.read()
+    return _prompt_cache[name]
+
+# Only the most recent turns are sent as history; repeats of older questions are
+# caught locally by the question index instead of by the prompt
+HISTORY_TURNS = 3
+# When a session is over its token cap, the history shrinks further
+CAPPED_HISTORY_TURNS = 1
+
+def build_messages(system_prompt, user_prompt):
+    # langchain_core is imported on first use, keeping it off the startup path
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    return [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+
+
 class InterviewManager:
-    def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
+    def __init__(self, session_id=None, ledger=None, log=None):
+        if not os.getenv("GROQ_API_KEY") and default_cache.mode != "replay":
             raise ValueError("GROQ_API_KEY not found in .env file")
-            
-        self.llm = ChatGroq(
-            temperature=0.7, 
-            model_name="llama-3.3-70b-versatile", 
-            groq_api_key=api_key
-        )
+
+        # Shared router: picks the model tier for each call type
+        self.router = get_default_router()
+        self.temperature = 0.7
         self.role = None
         self.topic = None
-        self.transcript = [] # List of (Question, Answer) tuples
+        self.turns = [] # List of Turn records
+        self.question_index = QuestionIndex()
+        self.session_id = session_id or "default"
+        self.ledger = ledger or default_ledger
+        # Optional TranscriptLog that turns and state changes are appended to
+        self.log = log
+        self._transcript_text = ""
+        # Timing of the last generated question and correction, attached to the next turn
+        self._last_question = None
+        self._last_correction = None
+
+    @property
+    def transcript(self):
+        """(question, answer) pairs, derived from the turn records."""
+        return [(turn.question, turn.answer) for turn in self.turns]
+
+    def restore_turns(self, turns):
+        """Loads turns replayed from a log, without logging them again."""
+        for turn in turns:
+            self.turns.append(turn)
+            self.question_index.add(turn.question)
+            self._transcript_text += turn.text()
+
+    def log_state(self, **fields):
+        if self.log is not None:
+            self.log.append(dict(fields, type="state"))
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+
+    def _invoke(self, messages, call_type, cacheable=True, on_token=None):
+        """
+        Calls the LLM routed for `call_type` and records the prompt/completion
+        tokens in the ledger.
+        """
+        response = self.router.invoke(
+            call_type, messages, self.temperature, cacheable=cacheable, on_token=on_token,
+            # A hedged duplicate still spends tokens even though its answer is dropped
+            on_discard=lambda discarded: self.ledger.record_response(self.session_id, call_type, discarded, messages)
+        )
+        self.ledger.record_response(self.session_id, call_type, response, messages)
+        return response
+
+    def is_over_token_cap(self):
+        return self.ledger.is_over_cap(self.session_id)
 
     def set_role(self, role):
         self.role = role
+        self.log_state(role=role)
 
     def set_topic(self, topic):
         self.topic = topic
+        self.log_state(topic=topic)
 
-    def generate_question(self, difficulty, is_followup=False, previous_question=None, previous_answer=None, is_developer=False):
+    def generate_question(self, difficulty, is_followup=False, previous_question=None, previous_answer=None, is_developer=False, on_token=None):
         """
         Generates a question based on role, topic, and difficulty.
         If is_followup is True, generates a follow-up question based on the previous answer.
         If is_developer is True, uses developer-specific prompt with coding questions.
+        If on_token is given, it is called as on_token(text, attempt) while the question
+        streams in; a new attempt number means the previous partial text was discarded.
         """
+        started = time.perf_counter()
         # Use developer prompt for coding interviews
-        prompt_file = "prompts/developer_interviewer_prompt.txt" if is_developer else "prompts/interviewer_prompt.txt"
-        prompt_template = open(prompt_file, "r").read()
+        prompt_file = "developer_interviewer_prompt.txt" if is_developer else "interviewer_prompt.txt"
+        prompt_template = load_prompt(prompt_file)
         system_prompt = prompt_template.format(
             role=self.role,
             topic=self.topic,
             difficulty=difficulty
         )
 
-        # Build a richer history containing both previous questions and answers
-        if self.transcript:
-            history_lines = ["\nPrevious Q&A history (most recent last):"]
-            for q, a in self.transcript:
-                history_lines.append(f"Q: {q}")
-                history_lines.append(f"A: {a}")
-            history = "\n" + "\n".join(history_lines)
+        # Over the token cap, degrade to a shorter history and a single attempt
+        over_cap = self.is_over_token_cap()
+        history_turns = self.turns[-(CAPPED_HISTORY_TURNS if over_cap else HISTORY_TURNS):]
+
+        # Build a richer history containing both previous questions and answers,
+        # from each turn's cached rendering
+        if history_turns:
+            history = "\n\nPrevious Q&A history (most recent last):\n" + "".join(turn.text() for turn in history_turns)
             system_prompt += history
 
             # Explicit instruction to avoid repeating any previous questions
@@ -62,24 +141,29 @@ class InterviewManager:
             )
             system_prompt += followup_context
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=("Generate the next question." if not is_followup else "Generate a follow-up question based on the candidate's answer."))
-        ]
+        messages = build_messages(
+            system_prompt,
+            ("Generate the next question." if not is_followup else "Generate a follow-up question based on the candidate's answer.")
+        )
 
-        # Try to generate a sufficiently technical, non-generic question.
-        # If the returned question looks too general, retry once with stronger constraints.
+        # Try to generate a sufficiently technical, non-generic, non-repeated question.
+        # If the returned question looks too general or repeats an earlier one,
+        # retry once with stronger constraints, then keep the best candidate.
         technical_keywords = [
             "explain", "design", "architecture", "complexity", "algorithm", "trade-off",
             "pseudocode", "implement", "code", "diagnose", "optimi", "memory", "latency",
             "scalab", "throughput", "consistency", "availability", "sql", "index", "concurrency"
         ]
 
+        call_type = "followup" if is_followup else "question"
+        candidates = []  # (is_duplicate, not is_technical, similarity, question)
         attempts = 0
-        max_attempts = 2
+        max_attempts = 1 if over_cap else 2
         while attempts < max_attempts:
             try:
-                response = self.llm.invoke(messages)
+                # Questions must vary between sessions, so only record/replay them
+                stream = (lambda text, attempt=attempts: on_token(text, attempt)) if on_token else None
+                response = self._invoke(messages, call_type, cacheable=False, on_token=stream)
             except Exception as e:
                 # On an invocation failure, raise so the caller can handle it
                 raise
@@ -89,6 +173,7 @@ class InterviewManager:
             # Simple heuristic: consider question technical if it contains any technical keyword
             q_lower = question.lower()
             is_technical = any(k in q_lower for k in technical_keywords)
+            self.router.record_quality(call_type, response.response_metadata.get("model"), is_technical)
 
             # For follow-ups, also prefer explicit reference to the candidate's prior answer
             if is_followup and previous_answer:
@@ -96,37 +181,91 @@ class InterviewManager:
                     # no-op; presence of previous_answer will be used in the system prompt already
                     pass
 
-            if is_technical or attempts == max_attempts - 1:
-                return question
+            # Check against every question asked so far, without another LLM call.
+            # A follow-up may build on the question it follows, just not repeat it
+            score, similar_question = self.question_index.find_duplicate(
+                question, previous_question if is_followup else None
+            )
+            is_duplicate = similar_question is not None
+            candidates.append((is_duplicate, not is_technical, score, question))
+
+            if (is_technical and not is_duplicate) or attempts == max_attempts - 1:
+                break
 
-            # If not technical enough, strengthen the system instructions and retry
+            # Strengthen the system instructions and retry
             attempts += 1
-            system_prompt += (
-                "\n\nThe previous question was too general. Now produce a highly technical, specific question. "
-                "Ask for explanation, design details, code/pseudocode, complexity analysis, or concrete debugging steps. "
-                "Do NOT ask vague or high-level survey questions."
-            )
+            if is_duplicate and is_followup:
+                system_prompt += (
+                    f"\n\nThe question \"{question}\" repeats an earlier question: \"{similar_question}\". "
+                    "Keep following up on the candidate's answer, but ask something not asked before."
+                )
+            elif is_duplicate:
+                system_prompt += (
+                    f"\n\nThe question \"{question}\" repeats an earlier question: \"{similar_question}\". "
+                    "Ask about a different concept."
+                )
+            if not is_technical:
+                system_prompt += (
+                    "\n\nThe previous question was too general. Now produce a highly technical, specific question. "
+                    "Ask for explanation, design details, code/pseudocode, complexity analysis, or concrete debugging steps. "
+                    "Do NOT ask vague or high-level survey questions."
+                )
 
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=("Generate the next question." if not is_followup else "Generate a follow-up question based on the candidate's answer."))
-            ]
+            messages = build_messages(
+                system_prompt,
+                ("Generate the next question." if not is_followup else "Generate a follow-up question based on the candidate's answer.")
+            )
 
+        # Prefer a non-duplicate, then a technical one, then the least similar
+        question = min(candidates)[3]
+        self._last_question = (question, time.time(), time.perf_counter() - started, difficulty, is_followup)
         return question
 
-    def record_interaction(self, question, answer):
-        self.transcript.append((question, answer))
+    def record_interaction(self, question, answer, raw_answer=None, difficulty=None, is_followup=None):
+        """
+        Records an answered question as a Turn. Timing, difficulty and the
+        follow-up flag are taken from the generate_question call that produced
+        `question`, and the raw answer from the correct_transcription call that
+        produced `answer`, unless given explicitly.
+        """
+        asked_at = question_latency = correction_latency = None
+        if self._last_question and self._last_question[0] == question:
+            _, asked_at, question_latency, asked_difficulty, asked_followup = self._last_question
+            difficulty = difficulty if difficulty is not None else asked_difficulty
+            is_followup = is_followup if is_followup is not None else asked_followup
+        if self._last_correction and self._last_correction[1] == answer:
+            raw_answer = raw_answer if raw_answer is not None else self._last_correction[0]
+            correction_latency = self._last_correction[2]
+
+        turn = Turn(
+            question, answer,
+            raw_answer=raw_answer,
+            difficulty=difficulty,
+            is_followup=bool(is_followup),
+            asked_at=asked_at,
+            question_latency=question_latency,
+            correction_latency=correction_latency,
+        )
+        self.turns.append(turn)
+        self.question_index.add(question)
+        self._transcript_text += turn.text()
+        if self.log is not None:
+            self.log.append(turn.to_record())
 
     def get_transcript_text(self):
-        text = ""
-        for q, a in self.transcript:
-            text += f"Q: {q}\nA: {a}\n\n"
-        return text
+        # Kept up to date as turns are recorded, so this is not rebuilt per call
+        return self._transcript_text
 
-    def correct_transcription(self, text, context):
+    def correct_transcription(self, text, context, call_type="correction", fallback=True):
         """
         Uses the LLM to correct potential transcription errors based on context.
+        Pass call_type="role_correction" when normalising a job role.
+        Skipped once the session is over its token cap. When skipped or when the
+        call fails, the raw text is returned, or None if fallback is False.
         """
+        if self.is_over_token_cap():
+            return text if fallback else None
+
         system_prompt = f"""You are a helpful assistant correcting speech-to-text errors for an interview context.
 Context: {context}
 Input: "{text}"
@@ -134,18 +273,20 @@ Task: Correct any obvious phonetic or transcription errors to make sense in the
 If the input seems completely unrelated or gibberish, return it as is or try to make the best guess.
 Output: Only the corrected text, nothing else."""
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content="Correct this text.")
-        ]
+        messages = build_messages(
+            system_prompt,
+            "Correct this text."
+        )
         
         try:
-            response = self.llm.invoke(messages)
+            started = time.perf_counter()
+            response = self._invoke(messages, call_type)
             corrected = response.content.strip()
             # Remove quotes if added
             if corrected.startswith('"') and corrected.endswith('"'):
                 corrected = corrected[1:-1]
+            self._last_correction = (text, corrected, time.perf_counter() - started)
             return corrected
         except Exception as e:
             print(f"(Correction failed: {e})")
-            return text
+            return text if fallback else None
@@ -0,0 +1,202 @@
+"""
+Caching and record/replay layer for LLM calls.
+
+Modes (LLM_CACHE_MODE):
+    off     - every call goes to the API (default)
+    cache   - identical cacheable calls are served from a memory LRU, backed by
+              JSON files in LLM_CACHE_DIR
+    record  - every call goes to the API and its response is saved as a cassette
+    replay  - every call is served from saved cassettes; no API key needed
+
+Responses are keyed on a hash of model, temperature and messages.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODES = ("off", "cache", "record", "replay")
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache")
+# Connections per model client. The Groq SDK default keeps only 100 idle and
+# closes the rest, so past 100 concurrent calls every call reconnects.
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 1000))
+
+
+class CacheMiss(KeyError):
+    """Raised in replay mode when no cassette exists for a call."""
+
+
+def cache_key(model, temperature, messages):
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [[m.type, m.content] for m in messages],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LLMCache:
+    """
+    Memory LRU in front of a directory of JSON cassettes (one file per key).
+    """
+
+    def __init__(self, mode=None, cache_dir=None, max_entries=None):
+        mode = mode or os.getenv("LLM_CACHE_MODE", "off")
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM_CACHE_MODE '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.cache_dir = cache_dir or os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_SIZE", 256))
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        entry = None
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._remember(key, entry)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+
+class CachedLLM:
+    """
+    Wraps a LangChain chat model so `invoke` goes through an LLMCache.
+    `llm` may be None in replay mode.
+    """
+
+    def __init__(self, llm, model, temperature, cache):
+        self.llm = llm
+        self.model = model
+        self.temperature = temperature
+        self.cache = cache
+
+    @staticmethod
+    def _to_entry(messages, response):
+        return {
+            "messages": [[m.type, m.content] for m in messages],
+            "content": response.content,
+            "response_metadata": getattr(response, "response_metadata", None) or {},
+        }
+
+    @staticmethod
+    def _from_entry(entry):
+        from langchain_core.messages import AIMessage
+
+        metadata = dict(entry.get("response_metadata") or {})
+        metadata["cached"] = True
+        return AIMessage(content=entry["content"], response_metadata=metadata)
+
+    def _call(self, messages, on_token):
+        if on_token is None:
+            return self.llm.invoke(messages)
+
+        # Stream, handing each chunk to on_token, and return the merged message
+        response = None
+        for chunk in self.llm.stream(messages):
+            if chunk.content:
+                on_token(chunk.content)
+            response = chunk if response is None else response + chunk
+        return response
+
+    def invoke(self, messages, cacheable=True, on_token=None):
+        """
+        `cacheable=False` marks calls whose output should vary between identical
+        inputs (e.g. question generation); they bypass the cache in "cache" mode
+        but are still recorded and replayed.
+        `on_token(text)` streams the response; a cached response arrives as one chunk.
+        """
+        mode = self.cache.mode
+        if mode == "off" or (mode == "cache" and not cacheable):
+            return self._call(messages, on_token)
+
+        key = cache_key(self.model, self.temperature, messages)
+        if mode in ("cache", "replay"):
+            entry = self.cache.get(key)
+            if entry is not None:
+                response = self._from_entry(entry)
+                if on_token is not None:
+                    on_token(response.content)
+                return response
+            if mode == "replay":
+                raise CacheMiss(f"No recorded LLM response for key {key} (model {self.model})")
+
+        response = self._call(messages, on_token)
+        self.cache.put(key, self._to_entry(messages, response))
+        return response
+
+
+# Shared cache for the whole process
+default_cache = LLMCache()
+
+
+def create_llm(model_name, temperature, cache=None):
+    """
+    Builds a (cached) Groq chat model. In replay mode no client or API key is needed.
+    """
+    cache = cache or default_cache
+    llm = None
+    if cache.mode != "replay":
+        import httpx
+        from langchain_groq import ChatGroq
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in .env file")
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        llm = ChatGroq(
+            temperature=temperature,
+            model_name=model_name,
+            groq_api_key=api_key,
+            http_client=httpx.Client(limits=limits)
+        )
+    return CachedLLM(llm, model_name, temperature, cache)
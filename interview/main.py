@@ -1,13 +1,29 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 from interview import InterviewManager
-from voice import transcribe_audio, speak_text
+from voice import transcribe_audio, preload_model, SpeechPipeline
 from feedback import generate_feedback_v2
+from llm_cache import default_cache
+from role_catalog import catalog
+from profiler import profiled, profile_name
 import os
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
+WELCOME_MSG = "Hi! I'm Zyra, your AI interview coach. Welcome to your mock interview session. Can you tell me which job role you're applying for?"
+ROLE_RETRY_MSG = "I couldn't catch that. Could you please repeat the job role?"
+ANSWER_RETRY_MSG = "I couldn't catch that clearly. Could you please repeat your answer?"
+FALLBACK_MSG = "I'm having trouble understanding your voice input. You can type your answer instead."
+NEXT_QUESTION_MSG = "Thank you. Let's move to the next question."
+CONCLUSION_MSG = "That concludes the interview. I am now generating your feedback."
+GOODBYE_MSG = "I have printed the detailed feedback on your screen. Good luck with your real interview!"
 
-def get_user_answer(question, manager, max_retries=2):
+# Synthesized once at startup, so they play without a TTS round trip
+STATIC_PHRASES = [WELCOME_MSG, ROLE_RETRY_MSG, ANSWER_RETRY_MSG, FALLBACK_MSG,
+                  NEXT_QUESTION_MSG, CONCLUSION_MSG, GOODBYE_MSG]
+
+
+def get_user_answer(question, manager, speech, max_retries=2):
     """
     Gets user answer with retry logic and option to type if audio fails.
     Returns the answer text or empty string if all attempts fail.
@@ -23,13 +39,11 @@ def get_user_answer(question, manager, max_retries=2):
             return corrected
         else:
             if attempt < max_retries:
-                retry_msg = "I couldn't catch that clearly. Could you please repeat your answer?"
-                speak_text(retry_msg)
+                speech.say(ANSWER_RETRY_MSG)
                 print("⚠️  Audio not clear. Please try speaking again.")
             else:
                 # After max retries, offer typing option
-                fallback_msg = "I'm having trouble understanding your voice input. You can type your answer instead."
-                speak_text(fallback_msg)
+                speech.say(FALLBACK_MSG)
                 print("\n⚠️  Voice input not detected clearly.")
                 print("You can now type your answer, or press Enter to skip this question.")
                 
@@ -51,16 +65,33 @@ def main():
     print("==========================================")
     
     # Check API Key
-    if not os.getenv("GROQ_API_KEY"):
+    if not os.getenv("GROQ_API_KEY") and default_cache.mode != "replay":
         print(" Error: GROQ_API_KEY not found in .env file.")
         print("Please add your API key to the .env file.")
         return
 
-    manager = InterviewManager()
-    
-    # 1. Welcome & Role
-    welcome_msg = "Hi! I'm Zyra, your AI interview coach. Welcome to your mock interview session. Can you tell me which job role you're applying for?"
-    speak_text(welcome_msg)
+    speech = SpeechPipeline()
+    speech.preload(STATIC_PHRASES)
+    try:
+        run_interview(speech)
+    finally:
+        speech.close()
+
+
+def run_interview(speech):
+    # Load Whisper and the LLM client while the welcome is spoken, instead of before it.
+    # The pool then runs LLM calls while the previous prompt is still playing.
+    preload_model()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending_manager = pool.submit(InterviewManager)
+
+        # 1. Welcome & Role
+        speech.say(WELCOME_MSG)
+        manager = pending_manager.result()
+        conduct_interview(manager, speech, pool)
+
+
+def conduct_interview(manager, speech, pool):
     
     # Get role with improved input handling
     role = ""
@@ -69,12 +100,10 @@ def main():
         role = transcribe_audio()
         if role and role.strip():
             print(f"(Raw transcription: {role})")
-            role = manager.correct_transcription(role, "Job Role Selection")
             break
         else:
             if attempt == 0:
-                retry_msg = "I couldn't catch that. Could you please repeat the job role?"
-                speak_text(retry_msg)
+                speech.say(ROLE_RETRY_MSG)
             else:
                 role = input("\n⚠️  Could not detect voice input. Please type the job role: ")
                 break
@@ -82,38 +111,55 @@ def main():
     if not role or not role.strip():
         role = input("Please enter the job role: ")
     
+    # Known roles resolve locally; only unknown ones need LLM correction
+    match = catalog.resolve_or_correct(
+        role,
+        lambda raw: manager.correct_transcription(raw, "Job Role Selection", call_type="role_correction", fallback=False)
+    )
+    role = match.name
     print(f"\n✓ Role: {role}")
     manager.set_role(role)
     
-    # 2. Topic - Only ask about core concepts from the role
-    topic_msg = f"Great! I'll focus on the core concepts and topics relevant to {role}. Let's begin the interview."
-    speak_text(topic_msg)
-    
     # Set topic to focus on core concepts of the role
-    topic = f"core concepts and topics for {role}"
+    topic = match.topic
     manager.set_topic(topic)
-    
+
+    def ask_ahead(difficulty):
+        # Runs on the pool; TTS starts as soon as the question text exists
+        question = manager.generate_question(difficulty)
+        if question and question.strip():
+            speech.prepare(question)
+        return question
+
     # 3. Questions Loop - At least 10 questions with follow-ups
     # Difficulty progression: Easy -> Medium -> Hard
     difficulty_levels = ["Easy", "Easy", "Medium", "Medium", "Medium", "Medium", "Hard", "Hard", "Hard", "Hard"]
-    
-    
+
+    # 2. Topic - Only ask about core concepts from the role.
+    # The first question is generated while this is spoken.
+    next_question = pool.submit(ask_ahead, difficulty_levels[0])
+    topic_msg = f"Great! I'll focus on the core concepts and topics relevant to {role}. Let's begin the interview."
+    speech.say(topic_msg)
+
     question_number = 0
     for i, difficulty in enumerate(difficulty_levels):
         question_number += 1
         print(f"\n\n--- Question {question_number} ({difficulty}) ---")
         
-        # Generate Question
+        # Generate Question (usually already generated during the previous prompt)
+        if next_question is None:
+            next_question = pool.submit(ask_ahead, difficulty)
         try:
-            question = manager.generate_question(difficulty)
+            question = next_question.result()
         except Exception as e:
             print(f"Error generating question: {e}")
             break
+        next_question = None
             
-        speak_text(question)
+        speech.say(question, is_question=True)
         
         # Get Answer with improved error handling
-        answer = get_user_answer(question, manager)
+        answer = get_user_answer(question, manager, speech)
         if not answer:
             print("⚠️  Skipping this question due to input issues.")
             continue
@@ -133,34 +179,41 @@ def main():
                 if followup_question and followup_question.strip():
                     question_number += 1
                     print(f"\n\n--- Follow-up Question {question_number} ({difficulty}) ---")
-                    speak_text(followup_question)
+                    speech.say(followup_question, is_question=True)
                     
                     # Get follow-up answer
-                    followup_answer = get_user_answer(followup_question, manager)
+                    followup_answer = get_user_answer(followup_question, manager, speech)
                     if followup_answer:
                         print(f"\n You said: {followup_answer}")
                         manager.record_interaction(followup_question, followup_answer)
             except Exception as e:
                 print(f"(Error generating follow-up: {e})")
         
-        # Brief acknowledgement before next question
+        # Brief acknowledgement before next question, while the question is generated
         if i < len(difficulty_levels) - 1:
-            speak_text("Thank you. Let's move to the next question.")
+            next_question = pool.submit(ask_ahead, difficulty_levels[i + 1])
+            speech.say(NEXT_QUESTION_MSG)
             
     # 4. Feedback
     print("\n\n==========================================")
     print("        GENERATING FEEDBACK ")
     print("==========================================")
-    speak_text("That concludes the interview. I am now generating your feedback.")
-    
     transcript = manager.get_transcript_text()
-    feedback = generate_feedback_v2(transcript, role, topic)
+    pending_feedback = pool.submit(generate_feedback_v2, transcript, role, topic)
+    speech.say(CONCLUSION_MSG)
+    feedback = pending_feedback.result()
     
     print(feedback)
+    gap_report = speech.report()
+    if gap_report:
+        print(f"\n({gap_report})")
     
     # Speak a summary or just the rating? 
     # Speaking the whole feedback might be too long. Let's just say it's ready.
-    speak_text("I have printed the detailed feedback on your screen. Good luck with your real interview!")
+    speech.say(GOODBYE_MSG)
 
 if __name__ == "__main__":
-    main()
+    # python main.py --profile writes a profile of the whole interview to PROFILE_DIR,
+    # sampling the pool threads too, since questions and feedback are generated there
+    with profiled("--profile" in sys.argv, profile_name("cli", label="voice-loop"), all_threads=True):
+        main()
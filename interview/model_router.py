@@ -0,0 +1,250 @@
+"""
+Routes each LLM call type to a model tier.
+
+Cheap rewriting tasks (transcription and role correction) go to a small,
+low-latency model; question generation and feedback stay on the large model.
+When a tier is rate-limited, or its model has used up its daily token limit in
+the ledger, the call falls back to the next tier, and latency,
+error and quality metrics are kept for every (call type, model) route.
+
+Configuration (environment):
+    LLM_MODEL_SMALL / LLM_MODEL_LARGE   - model name for each tier
+    LLM_ROUTE_<CALL_TYPE>               - tier for a call type, e.g. LLM_ROUTE_CORRECTION=large
+    LLM_HEDGE_CALL_TYPES                - comma-separated call types to hedge, e.g. question,followup
+    LLM_HEDGE_PERCENTILE                - latency percentile that triggers a hedge (default 0.9)
+    LLM_HEDGE_MAX_RATE                  - maximum fraction of calls hedged (default 0.1)
+"""
+
+import os
+import re
+import time
+import threading
+from collections import deque
+
+from llm_cache import create_llm
+from hedging import Hedger
+from token_ledger import ledger as default_ledger
+
+TIER_ORDER = ["small", "large"]
+
+DEFAULT_TIERS = {
+    "small": "llama-3.1-8b-instant",
+    "large": "llama-3.3-70b-versatile",
+}
+
+DEFAULT_ROUTES = {
+    "correction": "small",
+    "role_correction": "small",
+    "question": "large",
+    "followup": "large",
+    "feedback": "large",
+}
+
+# How many recent latencies to keep per route
+LATENCY_WINDOW = 200
+
+
+def is_rate_limit_error(error_str):
+    return 'rate_limit' in error_str.lower() or '429' in error_str or 'Rate limit' in error_str
+
+
+def parse_retry_after(error_str):
+    """
+    Extracts the wait time in seconds from a Groq rate limit error, or None
+    if the error is not a rate limit error.
+    """
+    if not is_rate_limit_error(error_str):
+        return None
+    match = re.search(r'try again in (?:(\d+)m)?(\d+\.?\d*)s', error_str)
+    if match:
+        return int(match.group(1) or 0) * 60 + float(match.group(2))
+    return 0.0
+
+
+class RouteStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.fallbacks = 0  # calls served here because the preferred tier was unavailable
+        self.quality_checks = 0
+        self.quality_passes = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "fallbacks": self.fallbacks,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "quality_pass_rate": round(self.quality_passes / self.quality_checks, 3) if self.quality_checks else None,
+        }
+
+
+class ModelRouter:
+    def __init__(self, tiers=None, routes=None, cache=None, hedged_call_types=None, ledger=None):
+        self.tiers = dict(DEFAULT_TIERS)
+        for tier in TIER_ORDER:
+            env_model = os.getenv(f"LLM_MODEL_{tier.upper()}")
+            if env_model:
+                self.tiers[tier] = env_model
+        self.tiers.update(tiers or {})
+
+        self.routes = dict(DEFAULT_ROUTES)
+        for call_type in DEFAULT_ROUTES:
+            env_tier = os.getenv(f"LLM_ROUTE_{call_type.upper()}")
+            if env_tier in self.tiers:
+                self.routes[call_type] = env_tier
+        self.routes.update(routes or {})
+
+        if hedged_call_types is None:
+            hedged_call_types = [t.strip() for t in os.getenv("LLM_HEDGE_CALL_TYPES", "").split(",") if t.strip()]
+        self.hedged_call_types = set(hedged_call_types)
+        self.hedger = Hedger(
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", 0.9)),
+            max_hedge_rate=float(os.getenv("LLM_HEDGE_MAX_RATE", 0.1))
+        )
+
+        self.cache = cache
+        self.ledger = ledger or default_ledger
+        self._lock = threading.Lock()
+        self._clients = {}       # (model, temperature) -> CachedLLM
+        self._cooldowns = {}     # tier -> monotonic time when it may be used again
+        self._stats = {}         # (call_type, model) -> RouteStats
+
+    def _client(self, model, temperature):
+        key = (model, temperature)
+        with self._lock:
+            client = self._clients.get(key)
+        if client is None:
+            client = create_llm(model, temperature, cache=self.cache)
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return client
+
+    def _stats_for(self, call_type, model):
+        key = (call_type, model)
+        if key not in self._stats:
+            self._stats[key] = RouteStats()
+        return self._stats[key]
+
+    def tier_order(self, call_type):
+        """
+        Preferred tier first, then the remaining tiers; tiers cooling down or out
+        of today's tokens go last.
+        """
+        preferred = self.routes.get(call_type, "large")
+        order = [preferred] + [t for t in TIER_ORDER if t != preferred and t in self.tiers]
+        exhausted = {t for t in order if self.ledger.remaining_budget(self.tiers[t]) <= 0}
+        now = time.monotonic()
+        with self._lock:
+            ready = [t for t in order if self._cooldowns.get(t, 0) <= now and t not in exhausted]
+            unavailable = [t for t in order if t not in ready]
+        return ready + unavailable
+
+    def invoke(self, call_type, messages, temperature, cacheable=True, on_discard=None, on_token=None):
+        """
+        Sends `messages` to the model routed for `call_type`, falling back to
+        the other tiers on rate limit errors. The response metadata is tagged
+        with the tier and model that served it.
+        For hedged call types, `on_discard(response)` receives the losing response.
+        `on_token(text)` streams the response; streamed calls of hedged call
+        types are hedged on their time to first token.
+        """
+        preferred = self.routes.get(call_type, "large")
+        last_error = None
+        for tier in self.tier_order(call_type):
+            model = self.tiers[tier]
+            client = self._client(model, temperature)
+            started = time.perf_counter()
+            try:
+                if on_token is not None and call_type in self.hedged_call_types:
+                    response = self.hedger.call_stream(
+                        f"{call_type}:{model}",
+                        lambda forward: client.invoke(messages, cacheable=cacheable, on_token=forward),
+                        on_token,
+                        on_discard=on_discard
+                    )
+                elif on_token is not None:
+                    response = client.invoke(messages, cacheable=cacheable, on_token=on_token)
+                elif call_type in self.hedged_call_types:
+                    response = self.hedger.call(
+                        f"{call_type}:{model}",
+                        lambda: client.invoke(messages, cacheable=cacheable),
+                        on_discard=on_discard
+                    )
+                else:
+                    response = client.invoke(messages, cacheable=cacheable)
+            except Exception as e:
+                error_str = str(e)
+                retry_after = parse_retry_after(error_str)
+                with self._lock:
+                    stats = self._stats_for(call_type, model)
+                    stats.errors += 1
+                    if retry_after is not None:
+                        stats.rate_limited += 1
+                        self._cooldowns[tier] = time.monotonic() + max(retry_after, 1.0)
+                if retry_after is None:
+                    raise
+                last_error = e
+                continue
+
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._stats_for(call_type, model)
+                stats.calls += 1
+                stats.latencies.append(elapsed)
+                if tier != preferred:
+                    stats.fallbacks += 1
+            response.response_metadata["tier"] = tier
+            response.response_metadata["model"] = model
+            return response
+
+        # Every tier is rate-limited; surface the last error to the caller
+        raise last_error
+
+    def record_quality(self, call_type, model, passed):
+        """Records whether a response from `model` met the caller's quality check."""
+        with self._lock:
+            stats = self._stats_for(call_type, model)
+            stats.quality_checks += 1
+            if passed:
+                stats.quality_passes += 1
+
+    def metrics(self):
+        with self._lock:
+            routes = {
+                f"{call_type}:{model}": stats.snapshot()
+                for (call_type, model), stats in self._stats.items()
+            }
+            now = time.monotonic()
+            cooldowns = {tier: round(until - now, 1) for tier, until in self._cooldowns.items() if until > now}
+        return {
+            "tiers": dict(self.tiers),
+            "routes": dict(self.routes),
+            "cooling_down": cooldowns,
+            "stats": routes,
+            "hedging": self.hedger.stats(),
+        }
+
+
+_default_router = None
+_default_router_lock = threading.Lock()
+
+
+def get_default_router():
+    """Process-wide router, so every session shares the same clients and metrics."""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = ModelRouter()
+        return _default_router
@@ -0,0 +1,220 @@
+"""
+Opt-in sampling profiler for interview turns.
+
+A background OS thread snapshots the profiled thread's Python stack (or every
+thread's, with all_threads=True) every PROFILE_INTERVAL_MS (default 5 ms)
+with sys._current_frames(), so the
+profiled code runs unmodified and time spent waiting on the LLM, Whisper or
+TTS shows up alongside CPU time. Profiles are written to PROFILE_DIR as
+speedscope JSON (https://www.speedscope.app) or collapsed stacks for
+flamegraph.pl (PROFILE_FORMAT=collapsed), named after the session and turn.
+
+A client can only ask for a profile when the server sets PROFILE_TOKEN, by
+sending that token; PROFILE_SAMPLE_RATE profiles a fraction of requests
+without any client involvement.
+
+Under gevent every greenlet shares one OS thread, so a profile also contains
+whatever other requests ran on that thread at the same time.
+"""
+
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import random
+import _thread
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+FORMATS = ("speedscope", "collapsed")
+
+
+def _os_thread_tools():
+    """
+    (start_new_thread, sleep, get_ident, allocate_lock) that work on real OS
+    threads even when gevent has patched them into greenlets, which could not
+    interrupt the code being profiled.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            return (
+                monkey.get_original("_thread", "start_new_thread"),
+                monkey.get_original("time", "sleep"),
+                monkey.get_original("_thread", "get_ident"),
+                monkey.get_original("_thread", "allocate_lock"),
+            )
+    except ImportError:
+        pass
+    return _thread.start_new_thread, time.sleep, _thread.get_ident, _thread.allocate_lock
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=None, thread_id=None, all_threads=False):
+        self.interval = interval or float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+        self._start_thread, self._sleep, self._get_ident, allocate_lock = _os_thread_tools()
+        # Profiles the thread that creates the profiler unless told otherwise;
+        # all_threads also samples worker threads (e.g. a ThreadPoolExecutor's)
+        self.thread_id = thread_id or self._get_ident()
+        self.all_threads = all_threads
+        self._lock = allocate_lock()
+        # (thread name, tuple of frame names (root first)) -> samples
+        self.stacks = Counter()
+        self._thread_names = {}
+        self.started_at = None
+        self.duration = 0.0
+        self._running = False
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._running = True
+        self._start_thread(self._sample_loop, ())
+        return self
+
+    def stop(self):
+        self._running = False
+        self.duration = time.perf_counter() - self.started_at
+        with self._lock:
+            return Counter(self.stacks)
+
+    def _thread_name(self, ident):
+        if ident not in self._thread_names:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._thread_names[ident] = names.get(ident, f"thread-{ident}")
+        return self._thread_names[ident]
+
+    def _sample_loop(self):
+        own_id = self._get_ident()
+        while self._running:
+            frames = sys._current_frames()
+            if self.all_threads:
+                frames.pop(own_id, None)
+            else:
+                frames = {self.thread_id: frames[self.thread_id]} if self.thread_id in frames else {}
+                if not frames:
+                    break
+            samples = []
+            for ident, frame in frames.items():
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                samples.append((self._thread_name(ident), tuple(reversed(stack))))
+            with self._lock:
+                if self._running:
+                    self.stacks.update(samples)
+            del frames
+            self._sleep(self.interval)
+
+    @property
+    def sample_count(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format: "root;child;leaf count" per line."""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        if self.all_threads:
+            # The thread is the root frame, so each thread gets its own tower
+            return "".join(f"{';'.join((thread,) + stack)} {count}\n" for (thread, stack), count in stacks)
+        return "".join(f"{';'.join(stack)} {count}\n" for (_, stack), count in stacks)
+
+    def speedscope(self, name):
+        """A speedscope "sampled" profile per thread, weighted in seconds."""
+        frames, index = [], {}
+        # thread name -> (samples, weights), starting with the profiled thread
+        threads = {self._thread_name(self.thread_id): ([], [])}
+        with self._lock:
+            stacks = list(self.stacks.items())
+        for (thread, stack), count in stacks:
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame})
+                sample.append(index[frame])
+            samples, weights = threads.setdefault(thread, ([], []))
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "interview-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{name} ({thread})" if self.all_threads else name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            } for thread, (samples, weights) in threads.items()],
+        }
+
+    def write(self, name, directory=None, fmt=None):
+        """Writes the profile and returns its path."""
+        directory = directory or os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR)
+        fmt = fmt or os.getenv("PROFILE_FORMAT", "speedscope")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown PROFILE_FORMAT '{fmt}', expected one of {FORMATS}")
+        os.makedirs(directory, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:120]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if fmt == "speedscope":
+            path = os.path.join(directory, f"{stamp}-{safe_name}.speedscope.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.speedscope(name), f)
+        else:
+            path = os.path.join(directory, f"{stamp}-{safe_name}.collapsed.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.collapsed())
+        return path
+
+
+def profile_name(session_id, turn_id=None, label=None):
+    parts = [label, f"session-{session_id}" if session_id else None, f"turn-{turn_id}" if turn_id else None]
+    return "-".join(p for p in parts if p)
+
+
+def should_profile(flag=None):
+    """
+    True if profiling was asked for with the server's PROFILE_TOKEN (as an
+    X-Profile header or "profile" field) or this request falls in the
+    PROFILE_SAMPLE_RATE sample. Without PROFILE_TOKEN, clients cannot ask.
+    """
+    token = os.getenv("PROFILE_TOKEN")
+    if token and flag is not None and hmac.compare_digest(str(flag).encode(), token.encode()):
+        return True
+    rate = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def profiled(enabled, name, all_threads=False):
+    """
+    Profiles the body of the with-block if `enabled` and writes the result.
+    With all_threads, threads the block hands work to are sampled as well.
+    """
+    if not enabled:
+        yield None
+        return
+    profiler = SamplingProfiler(all_threads=all_threads).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        # A full or read-only PROFILE_DIR must not fail the profiled work
+        try:
+            path = profiler.write(name)
+            print(f"Profile written to {path} ({profiler.sample_count} samples over {profiler.duration:.2f}s)")
+        except (OSError, ValueError) as e:
+            print(f"Could not write profile: {e}")
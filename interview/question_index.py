@@ -0,0 +1,106 @@
+"""
+Per-session near-duplicate detection for interview questions.
+
+Each question is reduced to a set of hashed word shingles (unigrams and
+bigrams of content words). A candidate is compared against every asked
+question with Jaccard similarity and containment, which for an interview's
+worth of questions takes microseconds and needs no LLM call.
+"""
+
+import re
+import threading
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words that appear in almost every interview question and carry no topic
+STOPWORDS = frozenset("""
+a an the and or but if then of to in on for with by as at from into about over is are was were be been
+being do does did can could would should will shall may might must you your yours we our i me my it its
+this that these those what which who whom how why when where there here please tell describe explain
+give example examples walk through us question let lets s t
+""".split())
+
+DEFAULT_THRESHOLD = 0.6
+# A follow-up builds on the question just asked, so only a near-verbatim repeat of it counts
+FOLLOWUP_THRESHOLD = 0.9
+
+
+def _stem(word):
+    """Crude plural stripping so "threads" and "thread" match."""
+    if len(word) > 4 and word.endswith(("sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def shingles(text):
+    """Hashed unigram and bigram shingles of the content words in `text`."""
+    words = [_stem(w) for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+    grams = set(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return frozenset(hash(g) for g in grams)
+
+
+def similarity(a, b):
+    """
+    The larger of Jaccard similarity and containment of the smaller set, so a
+    short question fully contained in a longer one still counts as a repeat.
+    """
+    if not a or not b:
+        return 0.0
+    overlap = len(a & b)
+    jaccard = overlap / len(a | b)
+    containment = overlap / min(len(a), len(b))
+    # Containment alone over-matches very short questions
+    if min(len(a), len(b)) < 6:
+        containment *= 0.8
+    return max(jaccard, containment)
+
+
+class QuestionIndex:
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._entries = []  # (question, shingles)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, question):
+        signature = shingles(question)
+        with self._lock:
+            self._entries.append((question, signature))
+
+    def most_similar(self, candidate, exclude=None):
+        """
+        Returns (score, question) for the closest asked question other than
+        `exclude`, or (0.0, None).
+        """
+        signature = shingles(candidate)
+        best_score, best_question = 0.0, None
+        with self._lock:
+            entries = list(self._entries)
+        for question, asked in entries:
+            if question == exclude:
+                continue
+            score = similarity(signature, asked)
+            if score > best_score:
+                best_score, best_question = score, question
+        return best_score, best_question
+
+    def is_near_duplicate(self, candidate):
+        return self.most_similar(candidate)[0] >= self.threshold
+
+    def find_duplicate(self, candidate, followup_of=None):
+        """
+        Returns (score, question): the closest asked question's score, and the
+        asked question `candidate` repeats or None. For a follow-up of
+        `followup_of`, that question only counts if repeated near-verbatim.
+        """
+        score, question = self.most_similar(candidate, exclude=followup_of)
+        if score >= self.threshold:
+            return score, question
+        if followup_of and similarity(shingles(candidate), shingles(followup_of)) >= FOLLOWUP_THRESHOLD:
+            return score, followup_of
+        return score, None
@@ -0,0 +1,298 @@
+"""
+Canonical job role catalog.
+
+Resolves a spoken or typed job role to a canonical role locally, using
+aliases, fuzzy matching (typos) and phonetic matching (speech-to-text
+errors). Each role has interview topics and a developer flag that selects
+the coding interview. Only roles the catalog cannot place need the LLM;
+those resolutions are cached so the next lookup is local.
+"""
+
+import os
+import re
+import json
+import difflib
+import threading
+from collections import namedtuple
+
+RoleMatch = namedtuple("RoleMatch", ["name", "is_developer", "topic", "method"])
+
+DEVELOPER_TOPIC = "coding problems, algorithms, data structures, and system design"
+
+# name, is_developer, topic, aliases
+ROLES = [
+    ("Software Engineer", True, DEVELOPER_TOPIC, [
+        "engineer", "developer", "software engineer", "software developer", "programmer", "coder",
+        "swe", "sde", "software development engineer", "backend engineer", "backend developer",
+        "back end engineer", "back end developer", "frontend engineer", "frontend developer",
+        "front end engineer", "front end developer", "full stack engineer", "full stack developer",
+        "fullstack engineer", "fullstack developer", "web developer", "web engineer", "mobile developer",
+        "mobile engineer", "android developer", "ios developer", "application developer",
+        "python developer", "java developer", "javascript developer", "react developer",
+        "node developer", "game developer", "embedded software engineer",
+    ]),
+    ("Data Scientist", False, "statistics, machine learning, experiment design, feature engineering, and model evaluation", [
+        "data scientist", "data science", "applied scientist",
+    ]),
+    ("Machine Learning Engineer", False, "machine learning algorithms, model training and deployment, MLOps, and evaluation", [
+        "machine learning engineer", "ml engineer", "ai engineer", "deep learning engineer",
+    ]),
+    ("Data Analyst", False, "SQL, data cleaning, statistics, visualization, and business metrics", [
+        "data analyst", "analytics", "business intelligence analyst", "bi analyst", "reporting analyst",
+    ]),
+    ("Data Engineer", False, "data pipelines, ETL, SQL, data modeling, and distributed data processing", [
+        "data engineer", "etl developer", "big data engineer",
+    ]),
+    ("DevOps Engineer", False, "CI/CD, infrastructure as code, containers, monitoring, and cloud operations", [
+        "devops engineer", "devops", "site reliability engineer", "sre", "platform engineer",
+        "release engineer", "build engineer",
+    ]),
+    ("Cloud Engineer", False, "cloud architecture, networking, security, cost management, and managed services", [
+        "cloud engineer", "cloud architect", "aws engineer", "azure engineer", "solutions architect",
+    ]),
+    ("QA Engineer", False, "test strategy, test automation, bug reporting, and quality processes", [
+        "qa engineer", "quality assurance", "qa", "tester", "test engineer", "sdet", "qa analyst",
+        "automation tester", "software tester",
+    ]),
+    ("Cybersecurity Analyst", False, "threat modeling, network security, incident response, and security controls", [
+        "cybersecurity analyst", "security analyst", "security engineer", "cyber security",
+        "information security analyst", "penetration tester", "soc analyst",
+    ]),
+    ("Network Engineer", False, "networking protocols, routing and switching, network security, and troubleshooting", [
+        "network engineer", "network administrator", "network admin",
+    ]),
+    ("Database Administrator", False, "database design, SQL tuning, backup and recovery, and replication", [
+        "database administrator", "dba", "database engineer",
+    ]),
+    ("System Administrator", False, "operating systems, scripting, user management, and server maintenance", [
+        "system administrator", "systems administrator", "sysadmin", "it administrator",
+    ]),
+    ("IT Support Specialist", False, "troubleshooting, hardware and software support, ticketing, and customer communication", [
+        "it support", "it support specialist", "help desk", "helpdesk", "technical support",
+        "desktop support",
+    ]),
+    ("Product Manager", False, "product strategy, prioritization, user research, metrics, and stakeholder management", [
+        "product manager", "pm", "product owner", "associate product manager", "apm",
+    ]),
+    ("Project Manager", False, "planning, scheduling, risk management, budgeting, and team coordination", [
+        "project manager", "program manager", "scrum master", "delivery manager",
+    ]),
+    ("UX Designer", False, "user research, wireframing, prototyping, usability testing, and design systems", [
+        "ux designer", "ui designer", "ui ux designer", "product designer", "interaction designer",
+        "user experience designer",
+    ]),
+    ("Graphic Designer", False, "visual design principles, typography, branding, and design tools", [
+        "graphic designer", "visual designer",
+    ]),
+    ("Business Analyst", False, "requirements gathering, process modeling, stakeholder communication, and data analysis", [
+        "business analyst", "ba", "systems analyst",
+    ]),
+    ("Sales Representative", False, "prospecting, sales process, negotiation, objection handling, and closing", [
+        "sales", "sales representative", "sales rep", "salesperson", "sales associate",
+        "sales executive", "account executive", "business development representative", "bdr", "sdr",
+        "sales development representative", "inside sales",
+    ]),
+    ("Retail Associate", False, "customer service, product knowledge, point of sale, inventory, and teamwork", [
+        "retail", "retail associate", "retail sales associate", "store associate", "cashier",
+        "shop assistant", "sales clerk", "store clerk",
+    ]),
+    ("Customer Service Representative", False, "customer communication, problem resolution, de-escalation, and service tools", [
+        "customer service", "customer service representative", "customer support",
+        "customer support representative", "call center agent", "customer success",
+    ]),
+    ("Marketing Manager", False, "marketing strategy, campaigns, digital marketing, analytics, and branding", [
+        "marketing", "marketing manager", "digital marketer", "digital marketing", "marketing specialist",
+        "content marketer", "seo specialist", "social media manager",
+    ]),
+    ("Human Resources Specialist", False, "recruiting, employee relations, labor law basics, onboarding, and HR policies", [
+        "hr", "human resources", "hr specialist", "human resources specialist", "recruiter",
+        "talent acquisition", "hr generalist",
+    ]),
+    ("Accountant", False, "financial statements, bookkeeping, tax basics, reconciliation, and accounting standards", [
+        "accountant", "accounting", "bookkeeper", "auditor",
+    ]),
+    ("Financial Analyst", False, "financial modeling, valuation, forecasting, budgeting, and reporting", [
+        "financial analyst", "finance analyst", "investment analyst",
+    ]),
+    ("Teacher", False, "lesson planning, classroom management, assessment, and student engagement", [
+        "teacher", "tutor", "educator", "instructor",
+    ]),
+    ("Nurse", False, "patient care, clinical procedures, medication safety, and communication", [
+        "nurse", "registered nurse", "rn", "nursing",
+    ]),
+]
+
+# Words dropped before matching ("I'm applying for a senior backend developer position")
+FILLER_WORDS = frozenset("""
+i im i'm am applying apply for to be a an the as role position job interview of my in
+senior junior lead principal staff intern internship entry level mid chief head trainee
+""".split())
+
+FUZZY_CUTOFF = 0.85
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "role_cache.json")
+
+
+def normalize(text):
+    words = re.findall(r"[a-z0-9']+", (text or "").lower().replace("-", " ").replace("/", " "))
+    kept = [w for w in words if w not in FILLER_WORDS]
+    # Keep something if the role is made only of filler ("Lead")
+    return " ".join(kept or words)
+
+
+def soundex(word):
+    """Classic American Soundex code for one word."""
+    codes = {c: str(d) for d, letters in enumerate(["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for c in letters}
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+    result = word[0].upper()
+    previous = codes.get(word[0], "")
+    for c in word[1:]:
+        code = codes.get(c, "")
+        if code and code != "0" and code != previous:
+            result += code
+        if c not in "hw":
+            previous = code
+    return (result + "000")[:4]
+
+
+def phonetic_key(text):
+    return " ".join(soundex(w) for w in text.split())
+
+
+class RoleCatalog:
+    def __init__(self, roles=None, cache_path=None):
+        self._lock = threading.Lock()
+        self._roles = {}     # canonical name -> (is_developer, topic)
+        self._aliases = {}   # normalized alias -> canonical name
+        self._phonetic = {}  # phonetic key -> canonical name
+        for name, is_developer, topic, aliases in (roles or ROLES):
+            self._roles[name] = (is_developer, topic)
+            for alias in aliases + [name]:
+                self._add_alias(alias, name)
+        self._builtin_aliases = sorted(self._aliases)
+
+        self.cache_path = cache_path or os.getenv("ROLE_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self._load_cache()
+
+    def _add_alias(self, alias, name):
+        key = normalize(alias)
+        self._aliases.setdefault(key, name)
+        self._phonetic.setdefault(phonetic_key(key), name)
+
+    def _match(self, name, method):
+        is_developer, topic = self._roles[name]
+        return RoleMatch(name, is_developer, topic, method)
+
+    def resolve(self, text):
+        """
+        Resolves a role locally. Returns a RoleMatch, or None if the role is unknown.
+        """
+        key = normalize(text)
+        if not key:
+            return None
+
+        with self._lock:
+            if key in self._aliases:
+                return self._match(self._aliases[key], "alias")
+
+            # Typos: "sofware enginer"
+            close = self._fuzzy(key)
+            if close:
+                return self._match(self._aliases[close], "fuzzy")
+
+            # Speech-to-text errors that sound the same: "sails representative"
+            sound = phonetic_key(key)
+            if sound in self._phonetic:
+                return self._match(self._phonetic[sound], "phonetic")
+
+        # Any other "<stack> developer" or "<domain> software engineer", e.g.
+        # "golang developer"; "software sales (engineer)" is not a coding role
+        words = key.split()
+        if words[-1] in ("developer", "programmer", "coder") or words[-2:] == ["software", "engineer"]:
+            return self._match("Software Engineer", "keyword")
+        return None
+
+    def _fuzzy(self, key):
+        """
+        Closest built-in alias to `key`, or None. Every word must be close to the
+        alias word in the same position, so a shared "engineer" cannot carry a
+        different first word ("sound engineer" is not "cloud engineer").
+        """
+        words = key.split()
+        for alias in difflib.get_close_matches(key, self._builtin_aliases, n=3, cutoff=FUZZY_CUTOFF):
+            alias_words = alias.split()
+            if len(alias_words) == len(words) and all(
+                    difflib.SequenceMatcher(None, a, b).ratio() >= FUZZY_CUTOFF
+                    for a, b in zip(words, alias_words)):
+                return alias
+        return None
+
+    def learn(self, text, name, is_developer=False, topic=None):
+        """
+        Records a resolution (typically from the LLM) so the next lookup is local.
+        Unknown role names are added to the catalog.
+        """
+        with self._lock:
+            if name not in self._roles:
+                self._roles[name] = (is_developer, topic or f"core concepts and topics for {name}")
+            self._add_alias(text, name)
+            self._add_alias(name, name)
+            match = self._match(name, "learned")
+        self._save_cache()
+        return match
+
+    def resolve_or_correct(self, text, correct):
+        """
+        Resolves locally; otherwise asks `correct(text)` (the LLM) for a cleaned-up
+        role, resolves that, and caches the result for `text`. If `correct` returns
+        None (the LLM did not answer), the raw text is used and nothing is cached.
+        """
+        match = self.resolve(text)
+        if match:
+            return match
+
+        corrected = correct(text)
+        if corrected is None:
+            name = text.strip()
+            name = name.title() if name.islower() else name
+            return RoleMatch(name, False, f"core concepts and topics for {name}", "uncorrected")
+
+        corrected = corrected.strip() or text.strip()
+        match = self.resolve(corrected)
+        if match:
+            return self.learn(text, match.name)
+        return self.learn(text, corrected.title() if corrected.islower() else corrected)
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, (is_developer, topic) in cached.get("roles", {}).items():
+            self._roles.setdefault(name, (is_developer, topic))
+        for alias, name in cached.get("aliases", {}).items():
+            if name in self._roles:
+                self._add_alias(alias, name)
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        with self._lock:
+            builtin = set(self._builtin_aliases)
+            learned_aliases = {a: n for a, n in self._aliases.items() if a not in builtin}
+            learned_roles = {n: list(self._roles[n]) for n in set(learned_aliases.values())}
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"roles": learned_roles, "aliases": learned_aliases}, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"(Could not save role cache: {e})")
+
+
+# Shared catalog for the whole process
+catalog = RoleCatalog()
@@ -0,0 +1,351 @@
+"""
+Child-process side of the code runner. Not imported by the app: code_runner
+starts it with `python -I` in the sandbox and sends one JSON job on stdin.
+Results are written as one JSON line per event, prefixed with RESULT_PREFIX,
+so a run that is killed part-way still reports what finished.
+
+The submitted code never runs in this process. The supervisor (main) starts
+a worker process (`--worker`) that loads the code and answers one request at
+a time over its own pipes; its standard streams point at /dev/null. Only the
+supervisor writes result lines, so the code cannot forge them, and it checks
+answers, times calls and fits complexity from what it observes itself.
+
+Job: {"code", "entry_point", "limits": {"memory_mb", "cpu_seconds"},
+      "tests": [{"args", "kwargs", "expected"}],
+      "benchmark": {"example": {"args", "kwargs"}, "start_n", "max_n",
+                    "max_seconds", "repeats"}}
+"""
+
+import ast
+import copy
+import io
+import json
+import math
+import os
+import random
+import signal
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+
+RESULT_PREFIX = "@@RESULT@@ "
+MAX_REPLY_CHARS = 1 << 20
+# Slack allowed between a call's time as reported by the worker and as seen
+# by the supervisor, on top of the measured round trip of an empty request
+TIMING_SLACK_SECONDS = 0.0005
+
+
+def emit(event, **data):
+    data["event"] = event
+    sys.stdout.write(RESULT_PREFIX + json.dumps(data, default=repr) + "\n")
+    sys.stdout.flush()
+
+
+def apply_limits(limits, allow_children=False):
+    """
+    Caps memory, CPU time, file size and child processes. Done in the process
+    itself rather than in a preexec_fn, which is unsafe in the threaded
+    server. Hard limits, so the submitted code cannot raise them again.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows: only the wall-clock timeout applies
+        return
+    memory = limits.get("memory_mb", 512) * 1024 * 1024
+    cpu = limits.get("cpu_seconds", 15)
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (1 << 20, 1 << 20))
+    if not allow_children:
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def find_entry_point(code, namespace, name=None):
+    """The named function, the first public method of a LeetCode-style
+    `Solution` class, or else the last top-level function."""
+    if name:
+        if name in namespace and callable(namespace[name]):
+            return namespace[name], name
+        if "Solution" in namespace and hasattr(namespace["Solution"], name):
+            return getattr(namespace["Solution"](), name), name
+        raise NameError(f"Function '{name}' not found")
+
+    if isinstance(namespace.get("Solution"), type):
+        methods = [m for m in vars(namespace["Solution"]) if not m.startswith("_") and callable(getattr(namespace["Solution"], m))]
+        if methods:
+            return getattr(namespace["Solution"](), methods[0]), methods[0]
+
+    functions = [node.name for node in ast.parse(code).body if isinstance(node, ast.FunctionDef)]
+    if not functions:
+        raise NameError("No function found in the submitted code")
+    return namespace[functions[-1]], functions[-1]
+
+
+def normalize(value):
+    # Tuples and lists compare equal once they have been through JSON
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def scalable(value):
+    """True if scale_value() grows this argument with n."""
+    return isinstance(value, (str, list)) and len(value) > 0
+
+
+def scale_value(value, n, rng):
+    """Grows one example argument to size n, keeping its element type and range."""
+    if isinstance(value, str) and value:
+        alphabet = sorted(set(value)) if len(set(value)) > 1 else list(string.ascii_lowercase)
+        return "".join(rng.choice(alphabet) for _ in range(n))
+    if isinstance(value, list) and value:
+        first = value[0]
+        if isinstance(first, list):
+            side = max(1, math.isqrt(n))
+            return [scale_value(first, side, rng) for _ in range(side)]
+        if all(isinstance(v, bool) for v in value):
+            return [rng.random() < 0.5 for _ in range(n)]
+        if all(isinstance(v, int) for v in value):
+            lo, hi = min(value), max(value)
+            lo, hi = (0 if lo >= 0 else -n), max(hi, n)
+            return [rng.randint(lo, hi) for _ in range(n)]
+        if all(isinstance(v, float) for v in value):
+            lo, hi = min(value), max(value)
+            return [rng.uniform(lo, max(hi, lo + 1.0)) for _ in range(n)]
+        return [rng.choice(value) for _ in range(n)]
+    return value
+
+
+def scale_example(example, n, seed):
+    rng = random.Random(seed)
+    args = [scale_value(a, n, rng) for a in example.get("args", [])]
+    kwargs = {k: scale_value(v, n, rng) for k, v in example.get("kwargs", {}).items()}
+    return args, kwargs
+
+
+# Worker: runs the submitted code, one request per line on its private pipes
+
+def call(fn, args, kwargs, stdout):
+    sys.stdout = stdout
+    try:
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, time.perf_counter() - started
+    finally:
+        sys.stdout = sys.__stdout__
+
+
+def handle(request, state):
+    op = request["op"]
+    if op == "ping":
+        return {}
+    if op == "load":
+        apply_limits(request.get("limits", {}))
+        code = request["code"]
+        namespace = {"__name__": "__solution__"}
+        try:
+            compiled = compile(code, "<solution>", "exec")
+            call(lambda: exec(compiled, namespace), [], {}, io.StringIO())
+            state["fn"], name = find_entry_point(code, namespace, request.get("entry_point"))
+        except SyntaxError as e:
+            return {"ok": False, "status": "syntax_error", "error": f"SyntaxError: {e.msg} (line {e.lineno})"}
+        return {"name": name}
+    if op == "call":
+        # Fresh copies each call, so in-place solutions do not see sorted input
+        args, kwargs = copy.deepcopy(request.get("args", [])), copy.deepcopy(request.get("kwargs", {}))
+        printed = io.StringIO()
+        actual, seconds = call(state["fn"], args, kwargs, printed)
+        return {"actual": normalize(actual), "seconds": seconds, "stdout": printed.getvalue()[-500:]}
+    if op == "prepare":
+        # Inputs are built and copied up front, so the timed runs only call the solution
+        example = scale_example(request["example"], request["n"], seed=request["n"])
+        state["inputs"] = [copy.deepcopy(example) for _ in range(request["copies"])]
+        return {}
+    if op == "run":
+        args, kwargs = state["inputs"].pop()
+        return {"seconds": call(state["fn"], args, kwargs, io.StringIO())[1]}
+    if op == "trace":
+        args, kwargs = state["inputs"].pop()
+        tracemalloc.start()
+        try:
+            call(state["fn"], args, kwargs, io.StringIO())
+            return {"peak_bytes": tracemalloc.get_traced_memory()[1]}
+        finally:
+            tracemalloc.stop()
+    if op == "memory":
+        import resource
+        return {"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    raise ValueError(f"Unknown request '{op}'")
+
+
+def worker_main():
+    # Keep private copies of the pipes and point the standard streams at
+    # /dev/null, so prints and writes to sys.__stdout__ cannot reach the supervisor
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    replies = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    state = {}
+    for line in requests:
+        request = json.loads(line)
+        try:
+            reply = handle(request, state)
+        except MemoryError:
+            reply = {"ok": False, "error": "MemoryError: memory limit exceeded"}
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        reply.setdefault("ok", True)
+        reply["id"] = request["id"]
+        replies.write(json.dumps(reply, default=repr) + "\n")
+        replies.flush()
+
+
+# Supervisor: never runs submitted code, and is the only writer of results
+
+class WorkerFailed(Exception):
+    pass
+
+
+class Worker:
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", "-S", os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self._next_id = 0
+
+    def request(self, op, **data):
+        """Returns (reply, seconds from sending the request to reading the reply)."""
+        self._next_id += 1
+        data.update(op=op, id=self._next_id)
+        started = time.perf_counter()
+        try:
+            self.process.stdin.write(json.dumps(data) + "\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline(MAX_REPLY_CHARS)
+        except (OSError, ValueError):
+            line = ""
+        elapsed = time.perf_counter() - started
+        if not line:
+            self.process.wait()
+            raise WorkerFailed(self._exit_reason())
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            reply = None
+        if not isinstance(reply, dict) or reply.get("id") != self._next_id:
+            self.process.kill()
+            raise WorkerFailed("The solution interfered with the test harness")
+        return reply, elapsed
+
+    def _exit_reason(self):
+        code = self.process.returncode
+        if code in (-getattr(signal, "SIGXCPU", 24), -getattr(signal, "SIGKILL", 9)):
+            return "Time limit exceeded"
+        return f"Solution process exited (code {code})"
+
+    def round_trip(self, samples=5):
+        return min(self.request("ping")[1] for _ in range(samples))
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.kill()
+        self.process.wait()
+
+
+def run_tests(worker, tests):
+    for index, test in enumerate(tests):
+        reply, _ = worker.request("call", args=test.get("args", []), kwargs=test.get("kwargs", {}))
+        if not reply["ok"]:
+            emit("test", index=index, passed=False, error=reply["error"])
+            continue
+        expected = test.get("expected")
+        passed = None if expected is None else reply["actual"] == normalize(expected)
+        emit("test", index=index, passed=passed, actual=reply["actual"],
+             seconds=reply["seconds"], stdout=reply["stdout"])
+
+
+def timed_run(worker, overhead):
+    """
+    Time of one call. The worker's own measurement is used unless the
+    supervisor saw the request finish sooner, so a solution cannot claim to
+    be faster than it was.
+    """
+    reply, elapsed = worker.request("run")
+    if not reply["ok"]:
+        raise WorkerFailed(reply["error"])
+    return max(reply["seconds"], elapsed - overhead - TIMING_SLACK_SECONDS)
+
+
+def run_benchmark(worker, spec):
+    example = spec["example"]
+    if not any(scalable(v) for v in list(example.get("args", [])) + list(example.get("kwargs", {}).values())):
+        emit("benchmark_skipped", reason="No list or string argument to grow with n")
+        return
+    repeats = spec.get("repeats", 3)
+    overhead = worker.round_trip()
+    n = spec.get("start_n", 128)
+    deadline = time.perf_counter() + spec.get("max_seconds", 5.0)
+    previous = None
+    while n <= spec.get("max_n", 1 << 17) and time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            reply, _ = worker.request("prepare", example=example, n=n, copies=repeats + 1)
+            if not reply["ok"]:
+                raise WorkerFailed(reply["error"])
+            seconds = min(timed_run(worker, overhead) for _ in range(repeats))
+            # A separate traced run, so tracing overhead does not skew timings
+            reply, _ = worker.request("trace")
+            if not reply["ok"]:
+                raise WorkerFailed(reply["error"])
+        except WorkerFailed as e:
+            emit("benchmark_error", n=n, error=str(e))
+            return
+        emit("point", n=n, seconds=seconds, peak_bytes=reply["peak_bytes"])
+        # Stop if the next size, growing at the rate seen so far, would overrun the budget
+        growth = max(2.0, seconds / previous) if previous else 2.0
+        if (time.perf_counter() - started) * growth > deadline - time.perf_counter():
+            return
+        previous = seconds
+        n *= 2
+
+
+def main():
+    job = json.loads(sys.stdin.read())
+    apply_limits(job.get("limits", {}), allow_children=True)
+    worker = Worker()
+    try:
+        reply, _ = worker.request("load", code=job["code"], entry_point=job.get("entry_point"),
+                                  limits=job.get("limits", {}))
+        if not reply["ok"]:
+            emit("fatal", status=reply.get("status", "error"), error=reply["error"])
+            return
+        emit("entry_point", name=reply["name"])
+        run_tests(worker, job.get("tests", []))
+        if job.get("benchmark"):
+            run_benchmark(worker, job["benchmark"])
+        reply, _ = worker.request("memory")
+        if reply["ok"]:
+            emit("memory", max_rss_kb=reply["max_rss_kb"])
+    except WorkerFailed as e:
+        emit("fatal", status="timeout" if e.args[0] == "Time limit exceeded" else "error", error=str(e))
+        return
+    finally:
+        worker.close()
+    emit("done")
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        worker_main()
+    else:
+        main()
@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import threading
+from datetime import date, datetime, timedelta
+
+
+# Groq limits tokens per day per model; its free tier allows roughly 100k on
+# llama-3.3-70b-versatile and 500k on llama-3.1-8b-instant. Override with
+# GROQ_MODEL_TOKEN_LIMITS ("model=tokens,..."); GROQ_DAILY_TOKEN_LIMIT applies
+# to models without a limit of their own.
+DEFAULT_DAILY_LIMIT = 100000
+DEFAULT_MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": 100000,
+    "llama-3.1-8b-instant": 500000,
+}
+# Usage recorded without a model name
+UNKNOWN_MODEL = "unknown"
+
+# Per-day usage files (<day>.jsonl), shared by every process using the same directory
+DEFAULT_USAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "token_usage")
+
+
+def extract_token_usage(response, messages=None):
+    """
+    Pulls (prompt_tokens, completion_tokens) out of a LangChain chat response.
+    Falls back to a rough 4-characters-per-token estimate when the provider
+    does not report usage.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    if token_usage.get("prompt_tokens") is not None:
+        return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+    # Estimate from text length
+    prompt_chars = sum(len(getattr(m, "content", "") or "") for m in (messages or []))
+    completion_chars = len(getattr(response, "content", "") or "")
+    return prompt_chars // 4, completion_chars // 4
+
+
+def parse_model_limits(text):
+    """Parses "model=tokens,model=tokens" into { model: tokens }."""
+    limits = {}
+    for item in (text or "").split(","):
+        model, _, tokens = item.partition("=")
+        if model.strip() and tokens.strip():
+            limits[model.strip()] = int(tokens)
+    return limits
+
+
+class TokenLedger:
+    """
+    Thread-safe record of LLM token usage, kept per session, per call type, per
+    model and per day. Each model has its own daily limit.
+
+    Each call is also appended to <directory>/<day>.jsonl. The files are read
+    back at startup and re-read (new lines only) before usage is reported, so
+    totals survive restarts and include calls made by other worker processes.
+    """
+
+    def __init__(self, daily_limit=None, session_cap=None, directory=None, model_limits=None):
+        if directory is None:
+            directory = os.getenv("TOKEN_USAGE_DIR", DEFAULT_USAGE_DIR)
+        if daily_limit is None:
+            daily_limit = int(os.getenv("GROQ_DAILY_TOKEN_LIMIT", DEFAULT_DAILY_LIMIT))
+        if session_cap is None and os.getenv("SESSION_TOKEN_CAP"):
+            session_cap = int(os.getenv("SESSION_TOKEN_CAP"))
+
+        if model_limits is None:
+            model_limits = dict(DEFAULT_MODEL_LIMITS)
+            model_limits.update(parse_model_limits(os.getenv("GROQ_MODEL_TOKEN_LIMITS")))
+
+        self.daily_limit = daily_limit  # for models without an entry in model_limits
+        self.model_limits = model_limits
+        self.session_cap = session_cap  # None means no per-session cap
+        self._lock = threading.Lock()
+        # { day: { "prompt": int, "completion": int, "calls": int } }
+        self._by_day = {}
+        # Today's calls: { session_id: { call_type: { "prompt": int, "completion": int, "calls": int } } }
+        self._by_session = {}
+        # Today's calls: { model: { "prompt": int, "completion": int, "calls": int } }
+        self._by_model = {}
+        # Today's calls: { session_id: { model: total tokens } }
+        self._session_models = {}
+        self._current_day = None
+        # { session_id: cap } overrides for individual sessions
+        self._session_caps = {}
+        # (timestamp, total_tokens, model) for today's calls, used for burn-rate projection
+        self._today_events = []
+        # Usage files: None disables persistence; { day: bytes read so far }
+        self.directory = directory or None
+        self._offsets = {}
+        if self.directory:
+            self._load()
+
+    @staticmethod
+    def _bump(bucket, prompt_tokens, completion_tokens):
+        bucket["prompt"] = bucket.get("prompt", 0) + prompt_tokens
+        bucket["completion"] = bucket.get("completion", 0) + completion_tokens
+        bucket["calls"] = bucket.get("calls", 0) + 1
+
+    def _apply(self, day, ts, session_id, call_type, prompt_tokens, completion_tokens, model=None):
+        """Adds a call to the in-memory totals. Callers hold self._lock."""
+        self._bump(self._by_day.setdefault(day, {}), prompt_tokens, completion_tokens)
+        if day != date.today().isoformat():
+            return
+
+        # Session and model totals (and so session caps and model limits) only
+        # count today's calls, so a reused session id such as "default" starts
+        # each day under its cap
+        if self._current_day != day:
+            self._by_session = {}
+            self._by_model = {}
+            self._session_models = {}
+            self._current_day = day
+        session_id = session_id or "default"
+        model = model or UNKNOWN_MODEL
+        calls = self._by_session.setdefault(session_id, {})
+        self._bump(calls.setdefault(call_type, {}), prompt_tokens, completion_tokens)
+        self._bump(self._by_model.setdefault(model, {}), prompt_tokens, completion_tokens)
+        models = self._session_models.setdefault(session_id, {})
+        models[model] = models.get(model, 0) + prompt_tokens + completion_tokens
+
+        # Drop events from previous days
+        day_start = datetime.combine(date.today(), datetime.min.time()).timestamp()
+        if self._today_events and self._today_events[0][0] < day_start:
+            self._today_events = [e for e in self._today_events if e[0] >= day_start]
+        self._today_events.append((ts, prompt_tokens + completion_tokens, model))
+
+    def _is_current(self):
+        """False after midnight until the day's first call resets the totals. Callers hold self._lock."""
+        return self._current_day == date.today().isoformat()
+
+    def _sessions_today(self):
+        """Today's per-session totals. Callers hold self._lock."""
+        return self._by_session if self._is_current() else {}
+
+    def _models_today(self):
+        """Today's per-model totals. Callers hold self._lock."""
+        return self._by_model if self._is_current() else {}
+
+    def _day_path(self, day):
+        return os.path.join(self.directory, f"{day}.jsonl")
+
+    def _load(self):
+        """Reads every day's usage file in the directory."""
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return
+        with self._lock:
+            for name in names:
+                if name.endswith(".jsonl"):
+                    self._read_day(name[:-len(".jsonl")])
+
+    def _read_day(self, day):
+        """Applies the lines appended to a day's file since it was last read. Callers hold self._lock."""
+        offset = self._offsets.get(day, 0)
+        try:
+            with open(self._day_path(day), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return
+        # A line another process is still writing is picked up next time
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offsets[day] = offset + len(complete)
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+                self._apply(day, entry["ts"], entry.get("session"), entry["call_type"],
+                            entry["prompt"], entry["completion"], entry.get("model"))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def _refresh(self):
+        """Picks up today's calls recorded by other processes. Callers hold self._lock."""
+        if self.directory:
+            self._read_day(date.today().isoformat())
+
+    def record(self, session_id, call_type, prompt_tokens, completion_tokens, model=None):
+        """Records a single LLM call made to `model`."""
+        today = date.today().isoformat()
+        now = time.time()
+        with self._lock:
+            if not self.directory:
+                self._apply(today, now, session_id, call_type, prompt_tokens, completion_tokens, model)
+                return
+            line = json.dumps({
+                "ts": now, "session": session_id, "call_type": call_type,
+                "prompt": prompt_tokens, "completion": completion_tokens, "model": model,
+            }) + "\n"
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                # One write per line in append mode, so lines from several processes don't interleave
+                with open(self._day_path(today), "ab+") as f:
+                    # Start a new line after a line torn by a crash
+                    if f.seek(0, os.SEEK_END):
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = "\n" + line
+                    f.write(line.encode("utf-8"))
+            except OSError as e:
+                print(f"(Token usage not saved: {e})")
+                self._apply(today, now, session_id, call_type, prompt_tokens, completion_tokens, model)
+                return
+            # Read back our line along with any other process's
+            self._refresh()
+
+    def record_response(self, session_id, call_type, response, messages=None):
+        """
+        Records the usage reported on a LangChain response, against the model the
+        router tagged it with. Cached responses are free.
+        """
+        metadata = getattr(response, "response_metadata", None) or {}
+        if metadata.get("cached"):
+            return
+        prompt_tokens, completion_tokens = extract_token_usage(response, messages)
+        self.record(session_id, call_type, prompt_tokens, completion_tokens, metadata.get("model"))
+
+    def limit_for(self, model):
+        """Daily token limit for `model`."""
+        return self.model_limits.get(model, self.daily_limit)
+
+    def _tracked_models(self):
+        """Models with a configured limit or usage today. Callers hold self._lock."""
+        return sorted(set(self.model_limits) | set(self._models_today()))
+
+    def used_today(self, model=None):
+        """Tokens used today on `model`, or on all models."""
+        with self._lock:
+            self._refresh()
+            if model is not None:
+                bucket = self._models_today().get(model, {})
+            else:
+                bucket = self._by_day.get(date.today().isoformat(), {})
+            return bucket.get("prompt", 0) + bucket.get("completion", 0)
+
+    def remaining_budget(self, model=None):
+        """
+        Tokens left in today's allowance for `model`, or the least left on any
+        model when `model` is None.
+        """
+        if model is not None:
+            return max(self.limit_for(model) - self.used_today(model), 0)
+        with self._lock:
+            models = self._tracked_models()
+        return min((self.remaining_budget(m) for m in models), default=max(self.daily_limit - self.used_today(), 0))
+
+    def projected_exhaustion(self, window_seconds=3600, model=None):
+        """
+        Estimates when today's allowance for `model` runs out, based on its burn
+        rate over the last `window_seconds`. With no model, the earliest of any
+        model's. Returns a datetime, or None if usage is idle or the allowance
+        will outlast the day.
+        """
+        if model is None:
+            with self._lock:
+                models = self._tracked_models()
+            projections = [p for p in (self.projected_exhaustion(window_seconds, m) for m in models) if p]
+            return min(projections, default=None)
+
+        now = time.time()
+        with self._lock:
+            self._refresh()
+            events = [(ts, tokens) for ts, tokens, m in self._today_events
+                      if m == model and ts >= now - window_seconds]
+        if not events:
+            return None
+
+        elapsed = max(now - events[0][0], 60.0)  # avoid wild projections from a single call
+        rate = sum(tokens for _, tokens in events) / elapsed  # tokens per second
+        if not rate:
+            return None
+        remaining = self.remaining_budget(model)
+        exhaustion = datetime.fromtimestamp(now + remaining / rate)
+        end_of_day = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+        return exhaustion if exhaustion < end_of_day else None
+
+    def set_session_cap(self, session_id, cap):
+        with self._lock:
+            if cap is None:
+                self._session_caps.pop(session_id, None)
+            else:
+                self._session_caps[session_id] = cap
+
+    def session_usage(self, session_id):
+        """Returns today's { call_type: { prompt, completion, calls } } for a session."""
+        with self._lock:
+            self._refresh()
+            calls = self._sessions_today().get(session_id or "default", {})
+            return {call_type: dict(bucket) for call_type, bucket in calls.items()}
+
+    def session_total(self, session_id):
+        return sum(b["prompt"] + b["completion"] for b in self.session_usage(session_id).values())
+
+    def is_over_cap(self, session_id):
+        """True when the session has used up its token cap (if one is set)."""
+        with self._lock:
+            cap = self._session_caps.get(session_id, self.session_cap)
+        if cap is None:
+            return False
+        return self.session_total(session_id) >= cap
+
+    def average_session_tokens(self, model=None):
+        """Average tokens a session used today, on `model` or on all models."""
+        with self._lock:
+            totals = [
+                models.get(model, 0) if model is not None else sum(models.values())
+                for models in self._session_models.values()
+            ] if self._is_current() else []
+        totals = [t for t in totals if t > 0]
+        return sum(totals) / len(totals) if totals else None
+
+    def interviews_remaining(self):
+        """How many more average sessions fit in every model's remaining allowance."""
+        with self._lock:
+            models = list(self._models_today())
+        counts = []
+        for model in models:
+            average = self.average_session_tokens(model)
+            if average:
+                counts.append(int(self.remaining_budget(model) // average))
+        return min(counts, default=None)
+
+    def summary(self):
+        """Snapshot of today's usage, suitable for returning as JSON."""
+        exhaustion = self.projected_exhaustion()
+        average = self.average_session_tokens()
+        with self._lock:
+            self._refresh()
+            models = self._tracked_models()
+            by_model = {model: dict(bucket) for model, bucket in self._models_today().items()}
+            by_call_type = {}
+            for calls in self._sessions_today().values():
+                for call_type, bucket in calls.items():
+                    totals = by_call_type.setdefault(call_type, {"prompt": 0, "completion": 0, "calls": 0})
+                    for key in totals:
+                        totals[key] += bucket[key]
+            by_day = {day: dict(bucket) for day, bucket in self._by_day.items()}
+
+        for model in models:
+            usage = by_model.setdefault(model, {"prompt": 0, "completion": 0, "calls": 0})
+            model_exhaustion = self.projected_exhaustion(model=model)
+            usage.update({
+                "daily_limit": self.limit_for(model),
+                "remaining_today": self.remaining_budget(model),
+                "projected_exhaustion": model_exhaustion.isoformat() if model_exhaustion else None,
+            })
+
+        return {
+            "used_today": self.used_today(),
+            # The model closest to its limit
+            "remaining_today": self.remaining_budget(),
+            "projected_exhaustion": exhaustion.isoformat() if exhaustion else None,
+            "average_tokens_per_session": round(average) if average else None,
+            "interviews_remaining": self.interviews_remaining(),
+            "by_model": by_model,
+            "by_call_type": by_call_type,
+            "by_day": by_day,
+        }
+
+
+# Shared ledger for the whole process
+ledger = TokenLedger()
@@ -0,0 +1,280 @@
+"""
+Structured interview turns and their append-only JSONL log.
+
+Each interview gets its own log file, <session>.<interview number>.jsonl, so
+starting over never overwrites a finished interview: a "session" header line,
+then "turn" lines as answers are recorded and "state" lines with the interview
+position. The file is opened for each append, so idle sessions hold no file
+descriptor, and every line is written out as it is appended, so a process
+crash loses nothing; fsync (protection against power loss) is batched every
+FSYNC_EVERY lines or FSYNC_SECONDS, and a background thread syncs lines left
+behind when a session goes quiet. Replaying the session's latest file
+rebuilds it after a restart.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions")
+FSYNC_EVERY = int(os.getenv("TRANSCRIPT_FSYNC_EVERY", 8))
+FSYNC_SECONDS = float(os.getenv("TRANSCRIPT_FSYNC_SECONDS", 2.0))
+
+
+def _fsync(fd):
+    """
+    os.fsync, moved to gevent's thread pool when gevent has patched the
+    process: it blocks in C, so on the event loop it would stall every
+    greenlet until the disk answers.
+    """
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is not None and monkey.is_module_patched("threading"):
+        import gevent
+        gevent.get_hub().threadpool.apply(os.fsync, (fd,))
+    else:
+        os.fsync(fd)
+
+
+# Logs with unsynced lines, synced by one background thread once they are due
+_pending = set()
+_pending_lock = threading.Lock()
+_flusher = None
+
+
+def _schedule_sync(log):
+    global _flusher
+    with _pending_lock:
+        _pending.add(log)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="transcript-fsync", daemon=True)
+            _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(max(FSYNC_SECONDS / 2, 0.1))
+        with _pending_lock:
+            logs = list(_pending)
+            _pending.clear()
+        for log in logs:
+            if not log.sync_if_due():
+                _schedule_sync(log)
+
+
+class Turn:
+    """One answered question. Slots keep long interviews compact in memory."""
+
+    __slots__ = (
+        "question", "answer", "raw_answer", "difficulty", "is_followup",
+        "asked_at", "answered_at", "question_latency", "correction_latency", "_text",
+    )
+
+    # Short keys for the log: field -> key
+    KEYS = {
+        "question": "q", "answer": "a", "raw_answer": "r", "difficulty": "d", "is_followup": "f",
+        "asked_at": "ta", "answered_at": "tb", "question_latency": "lq", "correction_latency": "lc",
+    }
+
+    def __init__(self, question, answer, raw_answer=None, difficulty=None, is_followup=False,
+                 asked_at=None, answered_at=None, question_latency=None, correction_latency=None):
+        self.question = question
+        self.answer = answer
+        # Only stored when transcription correction changed the answer
+        self.raw_answer = raw_answer if raw_answer != answer else None
+        self.difficulty = difficulty
+        self.is_followup = is_followup
+        self.asked_at = asked_at
+        self.answered_at = answered_at or time.time()
+        self.question_latency = question_latency
+        self.correction_latency = correction_latency
+        self._text = None
+
+    def __iter__(self):
+        # Unpacks like the old (question, answer) tuples
+        return iter((self.question, self.answer))
+
+    def text(self):
+        """The turn as transcript text, rendered once."""
+        if self._text is None:
+            self._text = f"Q: {self.question}\nA: {self.answer}\n\n"
+        return self._text
+
+    def to_record(self):
+        record = {"type": "turn"}
+        for field, key in self.KEYS.items():
+            value = getattr(self, field)
+            if value is not None and value is not False:
+                record[key] = round(value, 3) if isinstance(value, float) else value
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(**{field: record[key] for field, key in cls.KEYS.items() if key in record})
+
+
+class TranscriptLog:
+    def __init__(self, path, create=False, fsync_every=None, fsync_seconds=None):
+        """
+        Appends to the log at `path`. With create=True the file must not exist
+        yet (FileExistsError), so an earlier interview is never overwritten.
+        """
+        self.path = path
+        self.fsync_every = fsync_every or FSYNC_EVERY
+        self.fsync_seconds = fsync_seconds if fsync_seconds is not None else FSYNC_SECONDS
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._closed = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if create:
+            open(path, "x", encoding="utf-8").close()
+        elif _ends_mid_line(path):
+            # Terminate a line cut off by a crash so the next record is not glued to it
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._closed:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                self._unsynced += 1
+                if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_seconds:
+                    self._sync(f)
+            if self._unsynced:
+                # Synced later even if no further line arrives
+                _schedule_sync(self)
+
+    def _sync(self, f):
+        # fsync through any descriptor also covers lines written through earlier ones
+        _fsync(f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            if not self._closed and self._unsynced:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    self._sync(f)
+
+    def sync_if_due(self):
+        """Syncs once FSYNC_SECONDS have passed since the last sync. Returns False if not due yet."""
+        with self._lock:
+            if time.monotonic() - self._last_sync < self.fsync_seconds and self._unsynced and not self._closed:
+                return False
+        self.sync()
+        return True
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                if self._unsynced:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        self._sync(f)
+                self._closed = True
+
+
+def _ends_mid_line(path):
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except OSError:
+        return False
+
+
+def read_log(path):
+    """
+    Replays a log file. Returns (header, turns, state): the session header, the
+    recorded Turns in order, and the latest value of every state field.
+    A torn last line (crash mid-write) is ignored.
+    """
+    header, turns, state = {}, [], {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.pop("type", None)
+            if kind == "session":
+                header = record
+            elif kind == "turn":
+                turns.append(Turn.from_record(record))
+            elif kind == "state":
+                state.update(record)
+    return header, turns, state
+
+
+def log_dir():
+    """The directory session logs go in, or None if logging is off (TRANSCRIPT_LOG_DIR="")."""
+    directory = os.getenv("TRANSCRIPT_LOG_DIR", DEFAULT_LOG_DIR)
+    return directory or None
+
+
+def _file_prefix(session_id):
+    """A session id made safe to use in a file name."""
+    session_id = str(session_id)
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)[:80]
+    if safe != session_id:
+        safe += "-" + hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:8]
+    return safe
+
+
+def log_path(session_id, interview, directory=None):
+    """Log file of one interview of a session."""
+    directory = directory or log_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, f"{_file_prefix(session_id)}.{interview:04d}.jsonl")
+
+
+def _interviews(session_id, directory):
+    prefix = _file_prefix(session_id) + "."
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    numbers = []
+    for name in names:
+        if name.startswith(prefix) and name.endswith(".jsonl"):
+            number = name[len(prefix):-len(".jsonl")]
+            if number.isdigit():
+                numbers.append(int(number))
+    return numbers
+
+
+def latest_log_path(session_id, directory=None):
+    """Log file of the session's most recent interview, or None."""
+    directory = directory or log_dir()
+    if directory is None:
+        return None
+    numbers = _interviews(session_id, directory)
+    return log_path(session_id, max(numbers), directory) if numbers else None
+
+
+def new_log(session_id, directory=None):
+    """
+    Creates the log for the session's next interview and returns
+    (TranscriptLog, interview number), or (None, None) if logging is off.
+    """
+    directory = directory or log_dir()
+    if directory is None:
+        return None, None
+    interview = max(_interviews(session_id, directory), default=0) + 1
+    while True:
+        try:
+            return TranscriptLog(log_path(session_id, interview, directory), create=True), interview
+        except FileExistsError:
+            # Another interview of this session was started at the same moment
+            interview += 1
@@ -1,32 +1,112 @@
-import whisper
-import speech_recognition as sr
+import io
 import os
 import warnings
 import asyncio
-import edge_tts
-import pygame
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+# whisper (torch), speech_recognition, edge_tts and pygame are imported on
+# first use, so importing this module costs nothing before the first prompt.
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-# Load Whisper model once
-try:
-    print("Loading Whisper model... (this may take a moment)")
-    # Switch to tiny for speed, or keep base if accuracy is key. 
-    # User said "too slow", so let's try tiny first, or stick to base but optimize mic.
-    # Let's stick to base but optimize the interaction speed first.
-    model = whisper.load_model("base") 
-    print("Whisper model loaded.")
-except Exception as e:
-    print(f"Error loading Whisper model: {e}")
-    model = None
+WHISPER_MODEL = "base"
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+# One transcription at a time on the shared model
+_transcribe_lock = threading.Lock()
+# When the microphone last stopped recording (time.monotonic())
+_listen_ended_at = None
+
+
+def get_model():
+    """
+    Returns the Whisper model, loading it on first use (None if it fails to load).
+    """
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            try:
+                print("Loading Whisper model... (this may take a moment)")
+                import whisper
+                # Switch to tiny for speed, or keep base if accuracy is key. 
+                # User said "too slow", so let's try tiny first, or stick to base but optimize mic.
+                # Let's stick to base but optimize the interaction speed first.
+                _model = whisper.load_model(WHISPER_MODEL)
+                print("Whisper model loaded.")
+            except Exception as e:
+                print(f"Error loading Whisper model: {e}")
+                _model = None
+            _model_loaded = True
+        return _model
+
+
+def preload_model():
+    """
+    Starts loading the Whisper model in the background, so it is ready by the
+    time the first answer is recorded without delaying the first spoken prompt.
+    """
+    thread = threading.Thread(target=get_model, daemon=True)
+    thread.start()
+    return thread
+
+def transcribe_wav(wav_bytes):
+    """
+    Transcribes recorded WAV audio (from the microphone or a browser recording)
+    with Whisper. Returns the text, or empty string if it is only noise.
+    """
+    model = get_model()
+    if model is None:
+        return ""
+
+    # Save to temporary file
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(wav_bytes)
+        
+        # Transcribe with better parameters
+        with _transcribe_lock:
+            result = model.transcribe(path, 
+                                     language="en",
+                                     task="transcribe",
+                                     temperature=0.0,  # More deterministic
+                                     no_speech_threshold=0.6)
+        text = result['text'].strip()
+    finally:
+        # Clean up
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    # Check if transcription is meaningful (not just noise words)
+    if not text or len(text) < 2:
+        print("⚠️  Could not understand audio.")
+        return ""
+    
+    # Filter out common noise/error patterns
+    noise_patterns = ["thank you for watching", "you", "uh", "um", "hmm"]
+    if text.lower().strip() in noise_patterns and len(text.split()) <= 2:
+        print("⚠️  Detected noise, not meaningful speech.")
+        return ""
+        
+    return text
 
 def transcribe_audio():
     """
     Captures audio from the microphone and transcribes it using Whisper.
     Returns the transcribed text, or empty string if no audio detected.
     """
+    global _listen_ended_at
+    import speech_recognition as sr
+
+    model = get_model()
     if model is None:
         return ""
 
@@ -46,6 +126,7 @@ def transcribe_audio():
             try:
                 # Listen with reasonable timeout and phrase limit
                 audio = r.listen(source, timeout=8, phrase_time_limit=60)
+                _listen_ended_at = time.monotonic()
                 print("⏳ Processing audio...")
                 
                 # Check if audio has any data
@@ -53,37 +134,7 @@ def transcribe_audio():
                     print("⚠️  Audio too short, likely noise.")
                     return ""
                 
-                # Save to temporary file
-                with open("temp.wav", "wb") as f:
-                    f.write(audio.get_wav_data())
-                
-                # Transcribe with better parameters
-                result = model.transcribe("temp.wav", 
-                                         language="en",
-                                         task="transcribe",
-                                         temperature=0.0,  # More deterministic
-                                         no_speech_threshold=0.6)
-                text = result['text'].strip()
-                
-                # Clean up
-                if os.path.exists("temp.wav"):
-                    try:
-                        os.remove("temp.wav")
-                    except:
-                        pass
-                
-                # Check if transcription is meaningful (not just noise words)
-                if not text or len(text) < 2:
-                    print("⚠️  Could not understand audio.")
-                    return ""
-                
-                # Filter out common noise/error patterns
-                noise_patterns = ["thank you for watching", "you", "uh", "um", "hmm"]
-                if text.lower().strip() in noise_patterns and len(text.split()) <= 2:
-                    print("⚠️  Detected noise, not meaningful speech.")
-                    return ""
-                    
-                return text
+                return transcribe_wav(audio.get_wav_data())
                 
             except sr.WaitTimeoutError:
                 print("⚠️  No speech detected (Timeout).")
@@ -99,10 +150,44 @@ def transcribe_audio():
         print(f"⚠️  Error accessing microphone: {e}")
         return ""
 
-async def _generate_speech(text):
-    # Use a natural voice and increase rate slightly
-    communicate = edge_tts.Communicate(text, "en-US-AriaNeural", rate="+10%")
-    await communicate.save("temp_speech.mp3")
+TTS_VOICE = "en-US-AriaNeural"
+TTS_RATE = "+10%"
+
+async def _synthesize(text):
+    import edge_tts
+
+    communicate = edge_tts.Communicate(text, TTS_VOICE, rate=TTS_RATE)
+    chunks = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            chunks.append(chunk["data"])
+    return b"".join(chunks)
+
+def synthesize_speech(text):
+    """
+    Returns the spoken text as MP3 bytes, without playing it or touching disk.
+    Safe to call from worker threads (each call runs its own event loop).
+    """
+    return asyncio.run(_synthesize(text))
+
+_mixer_ready = False
+
+def _play(audio):
+    """
+    Plays MP3 bytes from memory and waits until playback finishes. The mixer
+    stays initialized between utterances.
+    """
+    global _mixer_ready
+    import pygame
+
+    if not _mixer_ready:
+        pygame.mixer.init()
+        _mixer_ready = True
+    pygame.mixer.music.load(io.BytesIO(audio), "mp3")
+    pygame.mixer.music.play()
+    while pygame.mixer.music.get_busy():
+        time.sleep(0.05)
+    pygame.mixer.music.unload()
 
 def speak_text(text):
     """
@@ -110,33 +195,81 @@ def speak_text(text):
     """
     try:
         print(f"\n🔊 AI: {text}")
-        
-        # Generate speech asynchronously
-        # Fix for Windows Event Loop Policy
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-        loop.run_until_complete(_generate_speech(text))
-        
-        # Initialize pygame mixer
-        pygame.mixer.init()
-        pygame.mixer.music.load("temp_speech.mp3")
-        pygame.mixer.music.play()
-        
-        # Wait for playback to finish
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
-            
-        # Clean up
-        pygame.mixer.quit()
-        if os.path.exists("temp_speech.mp3"):
-            try:
-                os.remove("temp_speech.mp3")
-            except PermissionError:
-                pass # Sometimes file is still locked
-            
+        _play(synthesize_speech(text))
     except Exception as e:
         print(f"\n(TTS Error: {e})")
+
+
+class SpeechPipeline:
+    """
+    Speaks prompts without waiting for text-to-speech. prepare(text) starts
+    synthesizing as soon as the text exists, also while something else is
+    playing, and keeps the audio in memory until say(text) plays it.
+
+    Records the gap between the end of each recorded answer and the start of
+    the next spoken question.
+    """
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self._lock = threading.Lock()
+        self._audio = {}      # text -> Future of MP3 bytes
+        self._static = set()  # phrases kept after playing, e.g. "Thank you..."
+        self._answer_measured = None
+        self.gaps = []
+
+    def prepare(self, text):
+        """Starts synthesizing `text` in the background; returns the Future."""
+        with self._lock:
+            future = self._audio.get(text)
+            if future is None:
+                future = self._audio[text] = self._pool.submit(synthesize_speech, text)
+            return future
+
+    def preload(self, phrases):
+        """Synthesizes fixed phrases once and keeps them for every time they are said."""
+        with self._lock:
+            self._static.update(phrases)
+        for text in phrases:
+            self.prepare(text)
+
+    def say(self, text, is_question=False):
+        """Plays `text`, synthesizing it first if prepare() was not called."""
+        print(f"\n🔊 AI: {text}")
+        future = self.prepare(text)
+        try:
+            audio = future.result()
+        except Exception as e:
+            print(f"\n(TTS Error: {e})")
+            audio = None
+        with self._lock:
+            if text not in self._static or audio is None:
+                self._audio.pop(text, None)
+
+        if is_question:
+            self._record_gap()
+        if audio:
+            try:
+                _play(audio)
+            except Exception as e:
+                print(f"\n(TTS Error: {e})")
+
+    def _record_gap(self):
+        answer_end = _listen_ended_at
+        if answer_end is None or answer_end == self._answer_measured:
+            return
+        self._answer_measured = answer_end
+        gap = time.monotonic() - answer_end
+        self.gaps.append(gap)
+        print(f"(Gap before question: {gap:.2f}s)")
+
+    def report(self):
+        """A one-line summary of the gaps before questions, or None if none were measured."""
+        if not self.gaps:
+            return None
+        gaps = sorted(self.gaps)
+        return (f"Gap between answer and next question: mean {sum(gaps) / len(gaps):.2f}s, "
+                f"median {gaps[len(gaps) // 2]:.2f}s, worst {gaps[-1]:.2f}s over {len(gaps)} questions")
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -10,6 +10,7 @@ import RoleSelection from './components/RoleSelection'
 import DeveloperInterview from './components/DeveloperInterview'
 import CameraPreview from './components/CameraPreview'
 import { speakText, initSpeechSynthesis, stopSpeech } from './utils/textToSpeech'
+import { InterviewSocket, socketURLFor } from './utils/interviewSocket'
 
 // Backend API URL
 const backendURL = "http://localhost:5000/api"
@@ -29,13 +30,52 @@ function App() {
   const [currentQuestion, setCurrentQuestion] = useState(null)
   const [questionInput, setQuestionInput] = useState(null)
   const [questionOutput, setQuestionOutput] = useState(null)
+  const [socketStatus, setSocketStatus] = useState('checking')
+  const [streamingText, setStreamingText] = useState('')
   const messagesEndRef = useRef(null)
+  const socketRef = useRef(null)
+  const streamRef = useRef({ turnId: null, attempt: null, text: '' })
+  // Advances only after a turn succeeds, so a double submit or a retry of the
+  // same turn reuses its idempotency key and the backend runs it only once
+  const turnSeqRef = useRef(0)
 
   // Initialize speech synthesis
   useEffect(() => {
     initSpeechSynthesis()
   }, [])
 
+  // Open the interview WebSocket (falls back to REST while it is down)
+  useEffect(() => {
+    const socket = new InterviewSocket(socketURLFor(backendURL), sessionId)
+    socketRef.current = socket
+    const unsubscribers = [
+      socket.on('status', setSocketStatus),
+      socket.on('token', (message) => {
+        // A new attempt means the backend discarded the previous partial question
+        const stream = streamRef.current
+        if (stream.turnId !== message.turn_id || stream.attempt !== message.attempt) {
+          streamRef.current = { turnId: message.turn_id, attempt: message.attempt, text: '' }
+        }
+        streamRef.current.text += message.text
+        setStreamingText(streamRef.current.text)
+      }),
+      socket.on('question', () => {
+        streamRef.current = { turnId: null, attempt: null, text: '' }
+        setStreamingText('')
+      }),
+      socket.on('event', (message) => {
+        if (message.event === 'rate_limit' && message.wait_time_seconds) {
+          setError(`Rate limit reached. You can continue in about ${Math.ceil(message.wait_time_seconds / 60)} minute(s).`)
+        }
+      }),
+    ]
+    socket.connect()
+    return () => {
+      unsubscribers.forEach(unsubscribe => unsubscribe())
+      socket.close()
+    }
+  }, [sessionId])
+
   // Auto-scroll to bottom when new messages are added
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
@@ -116,26 +156,36 @@ function App() {
     setError('')
     setIsLoading(true)
 
+    const idempotencyKey = `${sessionId}-turn-${turnSeqRef.current}`
+
     try {
-      // Send to backend with session ID and role
-      const response = await fetch(backendURL, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          message: userMessage,
-          session_id: sessionId,
-          role: selectedRole
-        }),
-      })
-
-      if (!response.ok) {
-        const errorText = await response.text().catch(() => 'Unknown error')
-        throw new Error(`Server error (${response.status}): ${errorText || response.statusText}`)
-      }
+      let data
+      if (socketRef.current && socketRef.current.isOpen()) {
+        // Send over the persistent connection
+        data = await socketRef.current.sendAnswer(userMessage, selectedRole, idempotencyKey)
+      } else {
+        // Send to backend with session ID and role
+        const response = await fetch(backendURL, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey,
+          },
+          body: JSON.stringify({ 
+            message: userMessage,
+            session_id: sessionId,
+            role: selectedRole
+          }),
+        })
+
+        if (!response.ok) {
+          const errorText = await response.text().catch(() => 'Unknown error')
+          throw new Error(`Server error (${response.status}): ${errorText || response.statusText}`)
+        }
 
-      const data = await response.json()
+        data = await response.json()
+      }
+      turnSeqRef.current += 1
       
       // Extract response text (handle different response formats)
       const backendResponse = data.response || data.message || data.text || JSON.stringify(data)
@@ -196,6 +246,7 @@ function App() {
       setMessages(prev => [...prev, errorMsg])
     } finally {
       setIsLoading(false)
+      setStreamingText('')
     }
   }
 
@@ -221,6 +272,29 @@ function App() {
     setError(errorMessage)
   }
 
+  /**
+   * Runs the candidate's code against the current coding question in the backend sandbox
+   * @param {string} code - The solution from the code editor
+   * @returns {Promise<object>} Test results and measured complexity
+   */
+  const runCode = async (code) => {
+    const response = await fetch(`${backendURL}/code/run`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        session_id: sessionId,
+        code
+      }),
+    })
+    const data = await response.json()
+    if (!response.ok || data.status !== 'success') {
+      throw new Error(data.error || `Server error: ${response.status}`)
+    }
+    return data.result
+  }
+
   /**
    * Handles role selection
    * @param {string} roleId - The selected role ID
@@ -233,24 +307,30 @@ function App() {
     setCurrentQuestion(null)
     setQuestionInput(null)
     setQuestionOutput(null)
+    turnSeqRef.current += 1 // a restarted interview must not replay old turns
 
     try {
-      const response = await fetch(`${backendURL}/start`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          session_id: sessionId,
-          role: roleId
-        }),
-      })
-
-      if (!response.ok) {
-        throw new Error(`Server error: ${response.status}`)
-      }
+      let data
+      if (socketRef.current && socketRef.current.isOpen()) {
+        data = await socketRef.current.start(roleId)
+      } else {
+        const response = await fetch(`${backendURL}/start`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ 
+            session_id: sessionId,
+            role: roleId
+          }),
+        })
+
+        if (!response.ok) {
+          throw new Error(`Server error: ${response.status}`)
+        }
 
-      const data = await response.json()
+        data = await response.json()
+      }
       const welcomeMessage = data.response || `Welcome! Let's start your ${roleId} interview.`
 
       // Add welcome message to chat
@@ -294,6 +374,11 @@ function App() {
 
   const isDeveloperRole = selectedRole === 'engineer'
 
+  // Show the question as it streams in over the WebSocket
+  const displayedMessages = streamingText
+    ? [...messages, { id: 'streaming', message: streamingText, sender: 'backend', timestamp: '' }]
+    : messages
+
   return (
     <div className="relative min-h-screen overflow-hidden bg-slate-950 text-slate-100">
       <div className="absolute inset-0 -z-30 theme-grid opacity-40"></div>
@@ -313,7 +398,7 @@ function App() {
               Voice, text, and webcam presence to mirror high-stakes interviews
             </p>
             <div className="flex flex-wrap justify-center items-center gap-4 mb-6">
-              <BackendStatus backendURL={backendURL} />
+              <BackendStatus backendURL={backendURL} socketStatus={socketStatus} />
               <label className="flex items-center gap-2 cursor-pointer bg-white/5 border border-white/10 px-3 py-2 rounded-2xl backdrop-blur-lg">
                 <input
                   type="checkbox"
@@ -368,7 +453,7 @@ function App() {
           isDeveloperRole ? (
             // Developer Interview - Split View
             <DeveloperInterview
-              messages={messages}
+              messages={displayedMessages}
               isLoading={isLoading}
               error={error}
               onSendMessage={sendMessage}
@@ -378,6 +463,7 @@ function App() {
               questionInput={questionInput}
               questionOutput={questionOutput}
               messagesEndRef={messagesEndRef}
+              onRunCode={runCode}
             />
           ) : (
             // Normal Interview - Chat View
@@ -392,7 +478,7 @@ function App() {
                   </div>
                 ) : (
                   <>
-                    {messages.map((msg) => (
+                    {displayedMessages.map((msg) => (
                       <ChatMessage
                         key={msg.id}
                         message={msg.message}
@@ -400,7 +486,7 @@ function App() {
                         timestamp={msg.timestamp}
                       />
                     ))}
-                    {isLoading && <LoadingSpinner message="Processing..." />}
+                    {isLoading && !streamingText && <LoadingSpinner message="Processing..." />}
                     <div ref={messagesEndRef} />
                   </>
                 )}
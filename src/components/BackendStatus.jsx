@@ -5,8 +5,10 @@ import React, { useState, useEffect } from 'react'
  * Checks if the backend is reachable
  * 
  * @param {string} backendURL - The backend API URL
+ * @param {string} socketStatus - Optional status of the interview WebSocket; when given,
+ *   it is shown directly and the backend is only polled while the socket is offline
  */
-const BackendStatus = ({ backendURL }) => {
+const BackendStatus = ({ backendURL, socketStatus }) => {
   const [status, setStatus] = useState('checking') // 'online', 'offline', 'checking'
   const [lastChecked, setLastChecked] = useState(null)
 
@@ -37,11 +39,17 @@ const BackendStatus = ({ backendURL }) => {
   }
 
   useEffect(() => {
+    if (socketStatus) {
+      // The open WebSocket already tells us the backend is reachable
+      setStatus(socketStatus)
+      setLastChecked(new Date())
+      if (socketStatus !== 'offline') return
+    }
     checkBackend()
     // Check every 10 seconds
     const interval = setInterval(checkBackend, 10000)
     return () => clearInterval(interval)
-  }, [backendURL])
+  }, [backendURL, socketStatus])
 
   const getStatusColor = () => {
     switch (status) {
@@ -21,11 +21,35 @@ const DeveloperInterview = ({
   currentQuestion,
   questionInput,
   questionOutput,
-  messagesEndRef
+  messagesEndRef,
+  onRunCode
 }) => {
   const [code, setCode] = useState('')
+  const [runResult, setRunResult] = useState(null)
+  const [runError, setRunError] = useState('')
+  const [isRunning, setIsRunning] = useState(false)
   const codeEditorRef = useRef(null)
 
+  // Results belong to the problem they were run against
+  useEffect(() => {
+    setRunResult(null)
+    setRunError('')
+  }, [currentQuestion])
+
+  const handleRun = async () => {
+    if (!onRunCode || !code.trim() || isRunning) return
+    setIsRunning(true)
+    setRunError('')
+    try {
+      setRunResult(await onRunCode(code))
+    } catch (err) {
+      setRunResult(null)
+      setRunError(err.message || 'Failed to run code')
+    } finally {
+      setIsRunning(false)
+    }
+  }
+
   // Auto-resize code editor
   useEffect(() => {
     if (codeEditorRef.current) {
@@ -145,12 +169,23 @@ const DeveloperInterview = ({
       <div className="flex-1 flex flex-col bg-slate-950/70 border border-white/10 rounded-3xl shadow-2xl shadow-black/40 p-6 min-h-[600px]">
         <div className="flex items-center justify-between mb-4">
           <h3 className="text-xl font-bold text-white">Code Editor</h3>
-          <button
-            onClick={() => setCode('')}
-            className="px-3 py-1.5 text-sm rounded-xl bg-white/10 text-white border border-white/20 hover:bg-white/20 transition-colors"
-          >
-            Clear
-          </button>
+          <div className="flex gap-2">
+            {onRunCode && (
+              <button
+                onClick={handleRun}
+                disabled={isRunning || !code.trim()}
+                className="px-3 py-1.5 text-sm rounded-xl bg-emerald-500/20 text-emerald-100 border border-emerald-400/40 hover:bg-emerald-500/30 transition-colors disabled:opacity-50"
+              >
+                {isRunning ? 'Running...' : 'Run'}
+              </button>
+            )}
+            <button
+              onClick={() => setCode('')}
+              className="px-3 py-1.5 text-sm rounded-xl bg-white/10 text-white border border-white/20 hover:bg-white/20 transition-colors"
+            >
+              Clear
+            </button>
+          </div>
         </div>
         
         <textarea
@@ -168,6 +203,36 @@ const DeveloperInterview = ({
           style={{ minHeight: '400px' }}
         />
         
+        {/* Run Results */}
+        {runError && (
+          <div className="mt-4 p-3 bg-rose-500/10 border border-rose-400/40 rounded-2xl">
+            <p className="text-sm text-rose-100">{runError}</p>
+          </div>
+        )}
+        {runResult && (
+          <div className="mt-4 p-3 bg-slate-900/80 rounded-2xl border border-white/10 text-xs font-mono text-slate-200 space-y-1">
+            {runResult.error && <div className="text-rose-200">{runResult.error}</div>}
+            <div>
+              Tests passed: {runResult.passed}/{runResult.checked}
+            </div>
+            {runResult.tests.filter(t => t.passed === false).map((t, idx) => (
+              <div key={idx} className="text-rose-200">
+                {t.error ? `${t.input} → ${t.error}` : `${t.input} → expected ${JSON.stringify(t.expected)}, got ${JSON.stringify(t.actual)}`}
+              </div>
+            ))}
+            {runResult.time_complexity && (
+              <div className="text-cyan-200">
+                Measured: time ~{runResult.time_complexity}, extra space ~{runResult.space_complexity}
+              </div>
+            )}
+            {runResult.benchmark_skipped && (
+              <div className="text-slate-400">
+                Complexity not measured: {runResult.benchmark_skipped}
+              </div>
+            )}
+          </div>
+        )}
+
         <div className="mt-4 p-3 bg-white/5 rounded-2xl border border-white/10">
           <p className="text-xs text-slate-300">
             💡 Tip: Write your solution in the code editor. You can explain your approach using voice or text input.
@@ -0,0 +1,239 @@
+/**
+ * Interview WebSocket client
+ * Carries a whole interview session over one persistent connection, with
+ * automatic reconnection and resume by session_id + last received seq.
+ * Answers still waiting for a reply are resent after a reconnect (the server
+ * runs each turn_id once), and give up after TURN_TIMEOUT.
+ */
+
+const MAX_RECONNECT_DELAY = 10000
+const TURN_TIMEOUT = 120000
+
+/**
+ * Derive the WebSocket URL from the REST API URL
+ * @param {string} backendURL - e.g. http://localhost:5000/api
+ */
+export const socketURLFor = (backendURL) => {
+  const url = new URL(backendURL)
+  url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:'
+  url.pathname = '/ws'
+  return url.toString()
+}
+
+export class InterviewSocket {
+  /**
+   * @param {string} url - WebSocket URL
+   * @param {string} sessionId - Interview session ID
+   */
+  constructor(url, sessionId) {
+    this.url = url
+    this.sessionId = sessionId
+    this.lastSeq = 0
+    this.ws = null
+    this.status = 'checking' // 'online', 'offline', 'checking'
+    this.handlers = {}
+    this.pendingTurns = {}
+    this.reconnectDelay = 500
+    this.closed = false
+    this.turnCounter = 0
+  }
+
+  /**
+   * Register a handler for a message type ('question', 'token', 'state', 'event', 'status', ...)
+   * Returns a function that removes the handler.
+   */
+  on(type, handler) {
+    this.handlers[type] = this.handlers[type] || []
+    this.handlers[type].push(handler)
+    return () => {
+      this.handlers[type] = this.handlers[type].filter(h => h !== handler)
+    }
+  }
+
+  emit(type, payload) {
+    (this.handlers[type] || []).forEach(handler => handler(payload))
+  }
+
+  setStatus(status) {
+    this.status = status
+    this.emit('status', status)
+  }
+
+  isOpen() {
+    return this.ws !== null && this.ws.readyState === WebSocket.OPEN
+  }
+
+  connect() {
+    this.closed = false
+    this.setStatus('checking')
+    const ws = new WebSocket(this.url)
+    this.ws = ws
+
+    ws.onopen = () => {
+      this.reconnectDelay = 500
+      // Resume: the server replays anything after lastSeq
+      ws.send(JSON.stringify({ type: 'hello', session_id: this.sessionId, last_seq: this.lastSeq }))
+    }
+
+    ws.onmessage = (event) => {
+      let message
+      try {
+        message = JSON.parse(event.data)
+      } catch (err) {
+        console.warn('Invalid message from backend:', event.data)
+        return
+      }
+      if (message.seq) {
+        if (message.seq <= this.lastSeq) return // already seen before reconnecting
+        this.lastSeq = message.seq
+      }
+      if (message.type === 'welcome') {
+        // A restarted server numbers its messages from 1 again
+        if (message.last_seq < this.lastSeq) {
+          this.lastSeq = message.last_seq
+        }
+        this.setStatus('online')
+        this.resendTurns()
+      }
+      this.resolveTurn(message)
+      this.emit(message.type, message)
+    }
+
+    ws.onclose = () => {
+      if (this.ws !== ws) return
+      this.ws = null
+      this.setStatus('offline')
+      if (!this.closed) {
+        setTimeout(() => this.connect(), this.reconnectDelay)
+        this.reconnectDelay = Math.min(this.reconnectDelay * 2, MAX_RECONNECT_DELAY)
+      }
+    }
+
+    ws.onerror = () => {
+      // onclose follows and handles reconnection
+    }
+  }
+
+  close() {
+    this.closed = true
+    if (this.ws) {
+      this.ws.close()
+      this.ws = null
+    }
+    Object.keys(this.pendingTurns).forEach(turnId => {
+      this.settleTurn(turnId, (w) => w.reject(new Error('Interview connection closed')))
+    })
+  }
+
+  send(message) {
+    if (!this.isOpen()) {
+      throw new Error('Interview connection is not open')
+    }
+    this.ws.send(JSON.stringify(message))
+  }
+
+  /**
+   * Settle every waiter of a pending turn and forget the turn
+   */
+  settleTurn(turnId, settle) {
+    const turn = this.pendingTurns[turnId]
+    if (!turn) return
+    delete this.pendingTurns[turnId]
+    clearTimeout(turn.timer)
+    turn.waiters.forEach(settle)
+  }
+
+  /**
+   * Settle the promise of the turn a server message belongs to
+   */
+  resolveTurn(message) {
+    if (!message.turn_id || !this.pendingTurns[message.turn_id]) return
+    if (message.type === 'question') {
+      this.settleTurn(message.turn_id, w => w.resolve({ response: message.text, state: message.state, status: 'success' }))
+    } else if (message.type === 'error') {
+      this.settleTurn(message.turn_id, w => w.reject(new Error(message.error || 'Backend error')))
+    } else if (message.type === 'event' && message.event === 'rate_limit') {
+      this.settleTurn(message.turn_id, w => w.resolve({ response: message.message, status: 'error', rate_limit_error: true, wait_time_seconds: message.wait_time_seconds }))
+    }
+  }
+
+  /**
+   * Resend answers that were not answered before the connection dropped.
+   * Replies the server kept were replayed before the welcome and already
+   * settled their turns, and a turn still running is not run twice.
+   */
+  resendTurns() {
+    Object.values(this.pendingTurns).forEach(turn => {
+      try {
+        this.send(turn.message)
+      } catch (err) {
+        // Closed again; the next welcome resends it
+      }
+    })
+  }
+
+  /**
+   * Send an answer and resolve with the backend's reply (same shape as the REST response)
+   * @param {string} text - The user's message
+   * @param {string} role - Optional selected role
+   * @param {string} turnId - Optional idempotency key; resending the same turn reuses it
+   */
+  sendAnswer(text, role, turnId) {
+    this.turnCounter += 1
+    turnId = turnId || `${this.sessionId}-${Date.now()}-${this.turnCounter}`
+    const message = { type: 'answer', text, role, turn_id: turnId }
+    return new Promise((resolve, reject) => {
+      try {
+        this.send(message)
+      } catch (err) {
+        reject(err)
+        return
+      }
+      // A duplicate submit of the same turn waits on the same reply
+      const turn = this.pendingTurns[turnId] || {
+        message,
+        waiters: [],
+        timer: setTimeout(() => {
+          this.settleTurn(turnId, w => w.reject(new Error('No reply from the interview server. Please try again.')))
+        }, TURN_TIMEOUT),
+      }
+      turn.waiters.push({ resolve, reject })
+      this.pendingTurns[turnId] = turn
+    })
+  }
+
+  /**
+   * Start (or restart) the interview
+   * @param {string} role - Optional selected role
+   */
+  start(role) {
+    return new Promise((resolve, reject) => {
+      const cleanup = () => {
+        removeMessage()
+        removeError()
+        removeStatus()
+      }
+      const removeMessage = this.on('message', (message) => {
+        cleanup()
+        resolve({ response: message.text, status: 'success' })
+      })
+      const removeError = this.on('error', (message) => {
+        if (message.turn_id) return
+        cleanup()
+        reject(new Error(message.error || 'Failed to start interview'))
+      })
+      // The welcome message is lost if the server restarts; the user can start again
+      const removeStatus = this.on('status', (status) => {
+        if (status !== 'offline') return
+        cleanup()
+        reject(new Error('Lost the connection to the interview server. Please try again.'))
+      })
+      try {
+        this.send({ type: 'start', role })
+      } catch (err) {
+        cleanup()
+        reject(err)
+      }
+    })
+  }
+}